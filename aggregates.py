@@ -0,0 +1,108 @@
+import pandas as pd
+
+import allocation
+import ledger
+import reconciliation
+
+UAP_CHART_COLUMNS = ["Data Date", "Interest rate", "Closing Balance"]
+
+# Coarser periods for the multi-year charts, tried in order until the series
+# fits in the requested number of points.
+UAP_RESOLUTIONS = [("M", "Month"), ("Q", "Quarter"), ("Y", "Year")]
+TRANSACTION_COLUMNS = ["Name", "Month", "Year", "Amount Deposited"]
+
+
+def build_cube(payments_df, uap_df, costs_df, fund_ledger, ledger_totals):
+    member_totals = payments_df.groupby("Name", observed=True)["Amount Deposited"].sum()
+
+    uap_history = uap_df.dropna(subset=["Data Date"]).sort_values("Data Date")
+    interest_by_year = uap_history.groupby("Year")["Interest rate"].agg(
+        ["mean", "min", "max", "count"]
+    )
+    # Row positions per year and per member instead of a copy of each slice.
+    uap_year_rows = {
+        int(year): rows for year, rows in uap_history.groupby("Year").indices.items()
+    }
+
+    latest_closing_balance = (
+        uap_history["Closing Balance"].iloc[-1] if len(uap_history) else 0.0
+    )
+
+    transactions = (
+        payments_df.sort_values("Payment Month", ascending=False)
+        .loc[:, TRANSACTION_COLUMNS]
+        .dropna()
+    )
+    transactions["Year"] = transactions["Year"].astype(str)
+    member_rows = transactions.groupby("Name", observed=True).indices
+
+    return {
+        "member_totals": member_totals,
+        "total_payment": float(ledger_totals["Payment"]),
+        "net_fund_value": (
+            float(fund_ledger["Balance"].iloc[-1]) if len(fund_ledger) else 0.0
+        ),
+        "ledger_monthly": ledger.monthly(fund_ledger),
+        "uap_reconciliation": reconciliation.reconcile(uap_df, payments_df, costs_df),
+        "average_interest": uap_history["Interest rate"].mean(),
+        "interest_by_year": interest_by_year,
+        "latest_closing_balance": float(latest_closing_balance),
+        "uap_history": uap_history.loc[:, UAP_CHART_COLUMNS].reset_index(drop=True),
+        "uap_year_rows": uap_year_rows,
+        "transactions": transactions.reset_index(drop=True),
+        "member_rows": member_rows,
+        "allocation": allocation.allocate(payments_df, uap_df),
+    }
+
+
+def member_total(cube, name):
+    return float(cube["member_totals"].get(name, 0.0))
+
+
+def member_fund_value(cube, name):
+    summary = cube["allocation"]["summary"]
+    if name not in summary.index:
+        return 0.0
+    return float(summary.at[name, "Fund Value"])
+
+
+def take_rows(frame, rows):
+    if rows is None:
+        return pd.DataFrame(columns=frame.columns)
+    return frame.take(rows).reset_index(drop=True)
+
+
+def year_interest(cube, year):
+    # Mean, min, max and count of the monthly rates recorded in that year.
+    interest_by_year = cube["interest_by_year"]
+    if int(year) not in interest_by_year.index:
+        return None
+    return interest_by_year.loc[int(year)]
+
+
+def year_uap(cube, year):
+    return take_rows(cube["uap_history"], cube["uap_year_rows"].get(int(year)))
+
+
+def uap_history(cube, max_points=36):
+    # Rates are averaged and balances taken at the end of each period.
+    history = cube["uap_history"]
+    if history.empty:
+        return pd.DataFrame(columns=UAP_CHART_COLUMNS), "Month"
+
+    for frequency, period_name in UAP_RESOLUTIONS:
+        periods = history["Data Date"].dt.to_period(frequency)
+        if periods.nunique() <= max_points or frequency == "Y":
+            break
+    if frequency == "M":
+        return history, period_name
+
+    resampled = history.groupby(periods).agg(
+        {"Interest rate": "mean", "Closing Balance": "last"}
+    )
+    resampled.insert(0, "Data Date", resampled.index.to_timestamp())
+    return resampled.reset_index(drop=True), period_name
+
+
+def member_transactions(cube, name):
+    return take_rows(cube["transactions"], cube["member_rows"].get(name))
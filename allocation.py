@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+def month_axis(payments_df, uap_df):
+    dates = pd.concat([payments_df["Payment Month"], uap_df["Data Date"]]).dropna()
+    if dates.empty:
+        return pd.PeriodIndex([], freq="M")
+    return pd.period_range(dates.min(), dates.max(), freq="M")
+
+
+def monthly_interest(uap_df, months):
+    uap = uap_df.dropna(subset=["Data Date"])
+    earned = uap["Opening Balance"] * uap["Interest rate"]
+    # Rows without a usable rate fall back to the change in balance.
+    earned = earned.fillna(uap["Closing Balance"] - uap["Opening Balance"])
+    earned = earned.groupby(uap["Data Date"].dt.to_period("M")).sum()
+    return earned.reindex(months, fill_value=0.0).to_numpy(dtype="float64")
+
+
+def contribution_matrix(payments_df, months):
+    payments = payments_df.dropna(subset=["Name", "Payment Month", "Amount Deposited"])
+    amounts = payments["Amount Deposited"].to_numpy(dtype="float64")
+
+    members = pd.Index(payments["Name"].astype(str).unique()).sort_values()
+    member_codes = members.get_indexer(payments["Name"].astype(str))
+    month_codes = months.get_indexer(payments["Payment Month"].dt.to_period("M"))
+
+    contributions = np.zeros((len(members), len(months)))
+    np.add.at(contributions, (member_codes, month_codes), amounts)
+    return members, contributions
+
+
+def allocate(payments_df, uap_df):
+    months = month_axis(payments_df, uap_df)
+    members, contributions = contribution_matrix(payments_df, months)
+    interest = monthly_interest(uap_df, months)
+
+    # Deposits are only recorded by month, so each one earns for the whole
+    # of its month: a member's share of a month's interest is their opening
+    # balance plus that month's deposits, over the fund's.
+    deposits = contributions.sum(axis=0)
+    fund_closing = np.cumsum(deposits + interest)
+    fund_opening = np.concatenate(([0.0], fund_closing[:-1]))
+    base = fund_opening + deposits
+    rate = np.divide(interest, base, out=np.zeros_like(interest), where=base > 0)
+
+    # balance[t] = (balance[t-1] + deposits[t]) * (1 + rate[t]) unrolls to
+    # growth[t] * cumsum(deposits * (1 + rate) / growth), with no month loop.
+    growth = np.cumprod(1.0 + rate)
+    balances = growth * np.cumsum(contributions * (1.0 + rate) / growth, axis=1)
+    opening = np.concatenate((np.zeros((len(members), 1)), balances[:, :-1]), axis=1)
+    earned = balances - opening - contributions
+
+    columns = months.to_timestamp()
+    return {
+        "balances": pd.DataFrame(balances, index=members, columns=columns),
+        "deposits": pd.DataFrame(contributions, index=members, columns=columns),
+        "interest": pd.DataFrame(earned, index=members, columns=columns),
+        "summary": pd.DataFrame(
+            {
+                "Total Paid": contributions.sum(axis=1),
+                "Interest Earned": earned.sum(axis=1),
+                "Fund Value": balances[:, -1] if len(months) else 0.0,
+            },
+            index=members,
+        ),
+    }
+
+
+def member_statement(allocation, name):
+    if name not in allocation["summary"].index:
+        return None
+    return pd.DataFrame(
+        {
+            "Month": allocation["balances"].columns,
+            "Deposited": allocation["deposits"].loc[name].to_numpy(),
+            "Interest Earned": allocation["interest"].loc[name].to_numpy(),
+            "Balance": allocation["balances"].loc[name].to_numpy(),
+        }
+    )
@@ -0,0 +1,428 @@
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import gspread
+import numpy as np
+import pandas as pd
+
+import aggregates
+import ledger
+import projection
+import save_queue
+import sheets_client
+import storage
+import sync
+
+SHEET_NAMES = ["Payments", "UAP Portfolio", "Costs"]
+RANGE_PATTERN = re.compile(r"^'(?P<sheet>.+)'!A(?P<row>\d+):")
+MONTH_NAMES = np.array(
+    pd.date_range("2000-01-01", periods=12, freq="MS").strftime("%B")
+)
+# What the login box needs, and what is only imported once a user logs in.
+LOGIN_IMPORTS = ["streamlit", "streamlit_authenticator", "yaml", "instrumentation"]
+PAGE_IMPORTS = [
+    "pandas",
+    "altair",
+    "gspread",
+    "gspread_dataframe",
+    "millify",
+    "pytz",
+    "streamlit_option_menu",
+]
+COST_ITEMS = np.array(["Bank charges", "Withdrawal fee", "Stationery", "Transport"])
+
+
+def generate(payment_rows, members, max_months=240, seed=0):
+    # Payments are spread over at most max_months months from January 2022,
+    # so that large row counts mean several payments per member per month
+    # rather than dates past what pandas can represent.
+    rng = np.random.default_rng(seed)
+    months = int(min(max_months, max(1, -(-payment_rows // members))))
+    month_starts = pd.date_range("2022-01-01", periods=months, freq="MS")
+    names = np.array([f"Member {number:05d}" for number in range(members)])
+
+    month_index = np.sort(rng.integers(0, months, payment_rows))
+    payment_dates = month_starts[month_index]
+    amounts = rng.choice([500.0, 1000.0, 2000.0, 5000.0], payment_rows)
+    payments = [
+        ["01-Jan-2022 00:00:00 EAT", month, name, amount, year, date]
+        for month, name, amount, year, date in zip(
+            MONTH_NAMES[payment_dates.month - 1].tolist(),
+            names[rng.integers(0, members, payment_rows)].tolist(),
+            amounts.tolist(),
+            payment_dates.year.tolist(),
+            payment_dates.strftime("%Y-%m-%d").tolist(),
+        )
+    ]
+
+    deposits = np.bincount(month_index, weights=amounts, minlength=months)
+    rates = rng.normal(0.009, 0.001, months).clip(0.0)
+    uap = []
+    opening = 0.0
+    for month_start, deposit, rate in zip(month_starts, deposits, rates):
+        closing = opening * (1 + rate) + deposit
+        uap.append(
+            [
+                "01-Jan-2022 00:00:00 EAT",
+                MONTH_NAMES[month_start.month - 1],
+                month_start.year,
+                round(closing, 2),
+                round(opening, 2),
+                round(float(rate), 5),
+                month_start.strftime("%Y-%m-%d"),
+            ]
+        )
+        opening = closing
+
+    cost_dates = month_starts[rng.integers(0, months, max(1, months // 3))]
+    costs = [
+        [
+            "01-Jan-2022 00:00:00 EAT",
+            MONTH_NAMES[date.month - 1],
+            item,
+            amount,
+            "",
+            date.year,
+            date.strftime("%Y-%m-%d"),
+        ]
+        for date, item, amount in zip(
+            cost_dates,
+            rng.choice(COST_ITEMS, len(cost_dates)).tolist(),
+            rng.choice([50.0, 100.0, 250.0], len(cost_dates)).tolist(),
+        )
+    ]
+
+    return {
+        "Payments": [storage.SHEET_COLUMNS["Payments"]] + payments,
+        "UAP Portfolio": [storage.SHEET_COLUMNS["UAP Portfolio"]] + uap,
+        "Costs": [storage.SHEET_COLUMNS["Costs"]] + costs,
+    }
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeClient:
+    def __init__(self, workbook):
+        self.workbook = workbook
+
+    def request(self, method, url, params=None):
+        self.workbook.api_call("drive_files_get")
+        return FakeResponse({"modifiedTime": str(self.workbook.modified)})
+
+
+class FakeWorksheet:
+    # Just enough of gspread.Worksheet for the storage backends, holding the
+    # sheet as a list of rows and sleeping `latency` seconds per API call.
+
+    def __init__(self, workbook, title, values):
+        self.workbook = workbook
+        self.title = title
+        self.values = values
+        self.append_options = []
+
+    def append_rows(self, values, **kwargs):
+        self.workbook.api_call("append_rows")
+        self.append_options.append(kwargs)
+        self.values.extend(list(row) for row in values)
+        self.workbook.modified += 1
+
+    def update(self, range_name, values, **kwargs):
+        self.workbook.api_call("update")
+        row_number = int(re.match(r"A(\d+)", range_name).group(1))
+        self.values[row_number - 1] = list(values[0])
+        self.workbook.modified += 1
+
+    def get_all_values(self, **kwargs):
+        self.workbook.api_call("get_all_values")
+        return [list(row) for row in self.values]
+
+    def clear(self):
+        self.workbook.api_call("clear")
+        del self.values[1:]
+        self.workbook.modified += 1
+
+
+class FakeWorkbook:
+    def __init__(self, values, latency=0.0):
+        self.id = "benchmark"
+        self.latency = latency
+        self.modified = 0
+        self.calls = Counter()
+        self.client = FakeClient(self)
+        self.worksheets = {
+            title: FakeWorksheet(self, title, sheet_values)
+            for title, sheet_values in values.items()
+        }
+
+    def api_call(self, name):
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def worksheet(self, title):
+        self.api_call("worksheet")
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def values_batch_get(self, ranges, params=None):
+        self.api_call("values_batch_get")
+        value_ranges = []
+        for value_range in ranges:
+            match = RANGE_PATTERN.match(value_range)
+            rows = self.worksheets[match["sheet"]].values[int(match["row"]) - 1 :]
+            value_ranges.append({"range": value_range, "values": rows})
+        return {"valueRanges": value_ranges}
+
+
+def timed(results, name, function, workbook, repeat=1, **details):
+    seconds = []
+    calls = Counter()
+    for _ in range(repeat):
+        before = Counter(workbook.calls)
+        start = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - start)
+        calls = workbook.calls - before
+    results.append(
+        {
+            "name": name,
+            "repeat": repeat,
+            "min_seconds": min(seconds),
+            "median_seconds": statistics.median(seconds),
+            "api_calls": dict(calls),
+            **details,
+        }
+    )
+    return result
+
+
+def import_times(modules, repeat=3):
+    # Each import is timed in a fresh interpreter, as a new server process
+    # would see it, after importing what the login box already needs.
+    directory = os.path.dirname(os.path.abspath(__file__))
+    times = {}
+    for module in modules:
+        preloaded = [name for name in LOGIN_IMPORTS if name != module]
+        if module in LOGIN_IMPORTS:
+            preloaded = preloaded[: LOGIN_IMPORTS.index(module)]
+        script = (
+            "import time\n"
+            + "".join(f"import {name}\n" for name in preloaded)
+            + "start = time.perf_counter()\n"
+            + f"import {module}\n"
+            + "print(time.perf_counter() - start)\n"
+        )
+        times[module] = min(
+            float(
+                subprocess.run(
+                    [sys.executable, "-c", script],
+                    cwd=directory,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+            )
+            for _ in range(repeat)
+        )
+    return times
+
+
+def sample_rows(values, sheet_name, count):
+    return [list(row) for row in values[sheet_name][1 : count + 1]]
+
+
+def run(payment_rows, members, latency=0.0, repeat=3, save_rows=10, seed=0):
+    values = generate(payment_rows, members, seed=seed)
+    workbook = FakeWorkbook(values, latency)
+    storage_backend = storage.SheetsStorage(
+        sheets_client.SheetsClient(workbook, requests_per_minute=10**9)
+    )
+    results = []
+
+    def cold_load():
+        return sync.sync_frames(storage_backend, SHEET_NAMES, sync.new_state())
+
+    frames = timed(results, "load_data.cold", cold_load, workbook, repeat)
+
+    state = sync.new_state()
+    sync.sync_frames(storage_backend, SHEET_NAMES, state)
+    timed(
+        results,
+        "load_data.unchanged",
+        lambda: sync.sync_frames(storage_backend, SHEET_NAMES, state),
+        workbook,
+        repeat,
+    )
+
+    def build_cube():
+        fund_ledger, ledger_totals = ledger.update(ledger.new_state(), frames)
+        return aggregates.build_cube(
+            frames["Payments"],
+            frames["UAP Portfolio"],
+            frames["Costs"],
+            fund_ledger,
+            ledger_totals,
+        )
+
+    cube = timed(results, "general_dashboard.build_cube", build_cube, workbook, repeat)
+    year = int(frames["UAP Portfolio"]["Year"].max())
+    timed(
+        results,
+        "general_dashboard.year_uap",
+        lambda: aggregates.year_uap(cube, year),
+        workbook,
+        repeat,
+    )
+    fund_projection = timed(
+        results,
+        "general_dashboard.projection",
+        lambda: projection.project(
+            frames["UAP Portfolio"]["Interest rate"],
+            cube["allocation"]["summary"]["Fund Value"],
+            projection.contribution_pattern(frames["Payments"]),
+        ),
+        workbook,
+        repeat,
+    )
+
+    member = cube["member_totals"].index[0]
+
+    def personal_dashboard():
+        return (
+            aggregates.member_total(cube, member),
+            aggregates.member_fund_value(cube, member),
+            aggregates.member_transactions(cube, member),
+            projection.member_bands(fund_projection, member),
+        )
+
+    timed(
+        results, "personal_dashboard.member_view", personal_dashboard, workbook, repeat
+    )
+
+    # Saves must never read the sheet back, whatever its size.
+    new_rows = sample_rows(values, "Payments", save_rows)
+    timed(
+        results,
+        "save.append_rows",
+        lambda: storage_backend.append_rows("Payments", new_rows),
+        workbook,
+        repeat,
+        rows=len(new_rows),
+    )
+    timed(
+        results,
+        "save.update_row",
+        lambda: storage_backend.update_row("Payments", 2, values["Payments"][1]),
+        workbook,
+        repeat,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        queue = save_queue.SaveQueue(os.path.join(directory, "save_queue.db"))
+
+        def flush_queue():
+            for row in new_rows:
+                queue.enqueue("Payments", [row])
+            return queue.flush(storage_backend)
+
+        timed(
+            results,
+            "save.queue_flush",
+            flush_queue,
+            workbook,
+            repeat,
+            jobs=len(new_rows),
+        )
+
+    timed(
+        results,
+        "load_data.after_save",
+        lambda: sync.sync_frames(storage_backend, SHEET_NAMES, state),
+        workbook,
+        1,
+    )
+
+    save_reads = sum(
+        result["api_calls"].get("get_all_values", 0)
+        + result["api_calls"].get("values_batch_get", 0)
+        for result in results
+        if result["name"].startswith("save.")
+    )
+    return {
+        "config": {
+            "payment_rows": payment_rows,
+            "members": members,
+            "uap_rows": len(values["UAP Portfolio"]) - 1,
+            "cost_rows": len(values["Costs"]) - 1,
+            "latency": latency,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "save_reads": save_reads,
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time data loading, dashboard computations and saves "
+        "against a synthetic in-memory spreadsheet."
+    )
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[1_000, 100_000], help="payment rows"
+    )
+    parser.add_argument("--members", type=int, nargs="+", default=[6])
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="seconds added to each API call"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+    # The same pandas mode as Analysis.py, so timings match the app.
+    pd.set_option("mode.copy_on_write", True)
+
+    report = {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "imports": {
+            "login": import_times(LOGIN_IMPORTS),
+            "after_login": import_times(PAGE_IMPORTS),
+        },
+        "runs": [
+            run(rows, members, args.latency, args.repeat, seed=args.seed)
+            for rows in args.rows
+            for members in args.members
+        ],
+    }
+    for benchmark_run in report["runs"]:
+        if benchmark_run["save_reads"]:
+            print(f"⚠️ saves read the sheet back: {benchmark_run['config']}")
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import pandas as pd
+
+import validation
+
+
+def read_chunks(file, filename, chunksize=5000):
+    if filename.lower().endswith(".xlsx"):
+        # Excel has no streaming reader in pandas, so the sheet is read once
+        # and validated in the same chunk sizes as a CSV.
+        frame = pd.read_excel(file, dtype=str, engine="openpyxl")
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start : start + chunksize]
+    else:
+        yield from pd.read_csv(file, dtype=str, chunksize=chunksize)
+
+
+def validate_chunk(chunk, names, years):
+    chunk = chunk.rename(columns=lambda column: str(column).strip())
+    # Row numbers as a spreadsheet user sees them: the header is row 1.
+    accepted, errors = validation.validate(
+        chunk,
+        validation.PAYMENTS_SCHEMA,
+        context={"names": names, "years": years},
+        row_offset=2,
+    )
+    accepted["Year"] = accepted["Year"].astype(int)
+    return accepted, errors
+
+
+def to_sheet_rows(accepted, timestamp):
+    payment_month = pd.to_datetime(
+        "1 " + accepted["Month"] + " " + accepted["Year"].astype(str),
+        format="%d %B %Y",
+    ).dt.strftime("%Y-%m-%d")
+    return pd.DataFrame(
+        {
+            "Timestamp": timestamp,
+            "Month": accepted["Month"],
+            "Name": accepted["Name"],
+            "Amount Deposited": accepted["Amount Deposited"],
+            "Year": accepted["Year"],
+            "Payment Month": payment_month,
+        }
+    ).values.tolist()
+
+
+def import_payments(chunks, names, years, append_rows, timestamp):
+    # timestamp is passed in, as fx.get_timestamp() for the app, so imported
+    # rows are stamped in the same zone and format as form entries.
+    accepted_count = 0
+    all_errors = []
+
+    for chunk in chunks:
+        accepted, errors = validate_chunk(chunk, names, years)
+        if not accepted.empty:
+            append_rows("Payments", to_sheet_rows(accepted, timestamp))
+            accepted_count += len(accepted)
+        all_errors.append(errors)
+
+    errors = pd.concat(all_errors, ignore_index=True) if all_errors else None
+    return accepted_count, errors
@@ -0,0 +1,281 @@
+from contextlib import nullcontext
+
+import altair as alt
+import pandas as pd
+import streamlit as st
+from millify import millify
+
+import aggregates
+import functions as fx
+import instrumentation
+import loaders
+import projection
+import reconciliation
+
+
+def projection_chart(bands, x_field, x_title):
+    base = alt.Chart(bands).encode(x=alt.X(f"{x_field}:Q", title=x_title))
+    outer = base.mark_area(opacity=0.2).encode(
+        y=alt.Y("P5:Q", title="Projected Value"), y2="P95:Q"
+    )
+    inner = base.mark_area(opacity=0.4).encode(y="P25:Q", y2="P75:Q")
+    median = base.mark_line().encode(y="P50:Q")
+    return outer + inner + median
+
+
+def general_dashboard(cube):
+    total_payment = cube["total_payment"]
+    average_interest = cube["average_interest"]
+    amount_on_max_date = cube["latest_closing_balance"]
+
+    st.write("---")
+
+    ttl_payments, ttl_uap, ttl_interest, ttl_fund = st.columns(4)
+
+    with ttl_payments:
+        st.metric(
+            "Amount paid by Members",
+            millify(total_payment, precision=2),
+            help="Total Member Payments (Including Non-UAP Deposits)",
+        )
+    with ttl_uap:
+        st.metric(
+            "Amount on UAP",
+            millify(amount_on_max_date, precision=2),
+            help="Total Amount on UAP",
+        )
+    with ttl_interest:
+        st.metric("Average Interest Earned", "{:.2%}".format(average_interest))
+    with ttl_fund:
+        st.metric(
+            "Net Fund Value",
+            millify(cube["net_fund_value"], precision=2),
+            help="Member payments plus UAP interest, less fund costs",
+        )
+
+    st.write("---")
+
+    year_charts()
+
+    with st.expander("🔎 UAP reconciliation"):
+        flagged_months = reconciliation.flagged(cube["uap_reconciliation"])
+        if flagged_months.empty:
+            st.success("✅ Every UAP month reconciles with the one before it")
+        else:
+            st.dataframe(flagged_months, use_container_width=True, hide_index=True)
+
+    with st.expander("📒 Fund ledger by month"):
+        st.dataframe(cube["ledger_monthly"], use_container_width=True, hide_index=True)
+
+    fund_projection()
+
+
+def chart_spec(chart):
+    # The same conversion st.altair_chart does on every call, done once per
+    # cache entry. Datasets stay DataFrames so Streamlit still sends them as
+    # Arrow rather than JSON.
+    datasets = {}
+
+    def keep_frame(data):
+        name = f"data_{len(datasets)}"
+        datasets[name] = data
+        return {"name": name}
+
+    alt.data_transformers.register("keep_frame", keep_frame)
+    default_theme = alt.themes.active == "default"
+    with alt.themes.enable("none") if default_theme else nullcontext():
+        with alt.data_transformers.enable("keep_frame"):
+            spec = chart.to_dict()
+    spec["datasets"] = datasets
+    return spec
+
+
+def uap_charts(filtered_df, period_name, time_unit):
+    interest_df = pd.DataFrame(
+        {
+            "Month": filtered_df["Data Date"],
+            "Interest Rate (%)": filtered_df["Interest rate"] * 100,
+        }
+    )
+    line = (
+        alt.Chart(interest_df)
+        .mark_line()
+        .encode(
+            x=alt.X("Month:T", timeUnit=time_unit, title=period_name),
+            y=alt.Y("Interest Rate (%):Q"),
+        )
+        .properties(
+            title=alt.TitleParams(
+                text=f"Interest rate by {period_name}", anchor="middle", fontSize=35
+            )
+        )
+    )
+
+    points = line.mark_point()
+
+    closing_balance_graph_df = pd.DataFrame(
+        {
+            "Month": filtered_df["Data Date"],
+            "Account Balance": filtered_df["Closing Balance"],
+        }
+    )
+    closing_balance_graph = (
+        alt.Chart(closing_balance_graph_df)
+        .mark_area()
+        .encode(
+            x=alt.X("Month:T", timeUnit=time_unit, title=period_name),
+            y=alt.Y("Account Balance:Q"),
+        )
+        .properties(
+            title=alt.TitleParams(
+                text=f"UAP Acct Closing Balance by {period_name}",
+                anchor="middle",
+                fontSize=35,
+            )
+        )
+    )
+
+    c_points = closing_balance_graph.mark_point()
+
+    return line + points, closing_balance_graph + c_points
+
+
+@instrumentation.cached(
+    st.cache_resource(max_entries=32, show_spinner=False), "uap_chart_specs"
+)
+def uap_chart_specs(year, data_version):
+    # Shared read-only by every session; year None means all years.
+    cube = loaders.load_cube(data_version)
+    if year is None:
+        history, period_name = aggregates.uap_history(
+            cube, st.secrets.get("chart_max_points", 36)
+        )
+        time_unit = {"Month": "yearmonth", "Quarter": "yearquarter"}.get(
+            period_name, "year"
+        )
+        charts = uap_charts(history, period_name, time_unit)
+    else:
+        charts = uap_charts(aggregates.year_uap(cube, year), "Month", "month")
+    return [chart_spec(chart) for chart in charts]
+
+
+def year_charts():
+    search_year, _ = st.columns(2)
+    with search_year:
+        all_years = st.toggle("All years", key="uap_all_years")
+        selected_year = st.selectbox(
+            "Year", fx.get_years_since_2022(), disabled=all_years
+        )
+
+    data_version = loaders.get_data_version()
+    if not all_years:
+        year_interest = aggregates.year_interest(
+            loaders.load_cube(data_version), selected_year
+        )
+        if year_interest is not None:
+            year_mean, year_low, year_high = st.columns(3)
+            year_mean.metric(
+                f"Average Interest in {selected_year}",
+                "{:.2%}".format(year_interest["mean"]),
+                help=f"Over {int(year_interest['count'])} months recorded",
+            )
+            year_low.metric(
+                "Lowest Monthly Rate", "{:.2%}".format(year_interest["min"])
+            )
+            year_high.metric(
+                "Highest Monthly Rate", "{:.2%}".format(year_interest["max"])
+            )
+
+    specs = uap_chart_specs(None if all_years else int(selected_year), data_version)
+    for spec in specs:
+        st.vega_lite_chart(spec, use_container_width=True)
+
+
+def fund_projection():
+    # Expanders render their contents even when collapsed, so the simulation
+    # only runs once it is asked for.
+    if not st.toggle("🔮 Show fund projection", key="show_fund_projection"):
+        return
+    years = st.slider("Years ahead", 1, 10, 10, key="fund_projection_years")
+    fund_bands = loaders.load_projection(loaders.get_data_version(), years)["fund"]
+    st.altair_chart(
+        projection_chart(fund_bands, "Month", "Months ahead"),
+        use_container_width=True,
+    )
+    st.caption(
+        "Shaded bands cover the 5th-95th and 25th-75th percentiles of "
+        "simulated paths; the line is the median."
+    )
+
+
+def personal_dashboard(current_user, cube):
+    average_interest = cube["average_interest"]
+    user_payments, user_interest, user_ttl = st.columns(3)
+
+    user_ttl_paid = aggregates.member_total(cube, current_user)
+    ttl_earned = aggregates.member_fund_value(cube, current_user)
+
+    with user_payments:
+        st.metric(
+            "Total Amount Paid",
+            millify(user_ttl_paid, precision=2),
+            help="Amount that you have so far put in Fraternity",
+        )
+    with user_interest:
+        st.metric(
+            "Average Interest Earned",
+            "{:.2%}".format(average_interest),
+        )
+    with user_ttl:
+        st.metric(
+            "Total Amount in Fraternity",
+            millify(ttl_earned, precision=2),
+            help="Your deposits plus your share of each month's UAP interest, in proportion to your balance",
+        )
+
+    transactions_df = aggregates.member_transactions(cube, current_user)
+
+    st.dataframe(
+        transactions_df,
+        use_container_width=True,
+        hide_index=True,
+    )
+
+    member_projection(current_user)
+
+
+def member_projection(current_user):
+    if not st.toggle("🔮 Show your projected fund value", key="show_member_projection"):
+        return
+    member_bands = projection.member_bands(
+        loaders.load_projection(loaders.get_data_version(), 10), current_user
+    )
+    if member_bands is None:
+        st.info("ℹ️ No payments recorded for you yet")
+    else:
+        st.altair_chart(
+            projection_chart(member_bands.reset_index(), "Year", "Years ahead"),
+            use_container_width=True,
+        )
+        st.dataframe(member_bands.round(2), use_container_width=True)
+
+
+def page(current_user):
+    with instrumentation.span("transform", "load_cube"):
+        cube = loaders.load_cube(loaders.get_data_version())
+
+    # Only the open view is computed, unlike st.tabs, which runs every tab.
+    view = st.radio(
+        "View",
+        ["🎡 General", "🕴🏾 Personal"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="dashboard_view",
+    )
+
+    if view == "🎡 General":
+        with instrumentation.span("render", "general_dashboard"):
+            general_dashboard(cube)
+    else:
+        with instrumentation.span("render", "personal_dashboard"):
+            personal_dashboard(current_user, cube)
@@ -0,0 +1,588 @@
+import random
+import sqlite3
+
+import pandas as pd
+import streamlit as st
+
+import bulk_import
+import functions as fx
+import instrumentation
+import key_index
+import loaders
+import reconciliation
+import storage
+import validation
+
+
+def split_duplicates(sheet_name, rows, duplicate_policy):
+    index = loaders.get_key_index(sheet_name)
+    columns = storage.SHEET_COLUMNS[sheet_name]
+
+    new_rows, replacements, skipped = [], [], []
+    for row in rows:
+        key = key_index.row_key(sheet_name, dict(zip(columns, row)))
+        row_number = index.claim(key)
+        if row_number is None:
+            new_rows.append(row)
+        elif duplicate_policy == "Replace":
+            replacements.append((row_number, row))
+        else:
+            skipped.append(key)
+    return new_rows, replacements, skipped
+
+
+def append_new_rows(sheet_name, rows):
+    # Claimed keys are tied to the job that saves them, or released if the
+    # rows could not be queued, so a failed save does not block re-entry.
+    index = loaders.get_key_index(sheet_name)
+    columns = storage.SHEET_COLUMNS[sheet_name]
+    keys = [key_index.row_key(sheet_name, dict(zip(columns, row))) for row in rows]
+    try:
+        job_id = loaders.append_to_sheet(sheet_name, rows)
+    except Exception:
+        index.release(keys)
+        raise
+    index.assign(keys, job_id)
+    return job_id
+
+
+def save_keyed_rows(sheet_name, rows):
+    # Payments and UAP entries are unique per (Name,) Month and Year; existing
+    # entries are skipped or replaced as chosen on the Data Entry page.
+    duplicate_policy = st.session_state.get("duplicate_policy", "Skip")
+    new_rows, replacements, skipped = split_duplicates(
+        sheet_name, rows, duplicate_policy
+    )
+    still_saving = []
+
+    try:
+        # An entry that is still queued has no sheet row to replace yet, so
+        # the queue is flushed first and those rows are looked up again.
+        queued_rows = [
+            row for row_number, row in replacements if row_number == key_index.PENDING
+        ]
+        if queued_rows:
+            loaders.flush_saves()
+            more_new_rows, more_replacements, _ = split_duplicates(
+                sheet_name, queued_rows, duplicate_policy
+            )
+            new_rows += more_new_rows
+            replacements = [
+                (row_number, row)
+                for row_number, row in replacements + more_replacements
+                if row_number != key_index.PENDING
+            ]
+            still_saving = [
+                row
+                for row_number, row in more_replacements
+                if row_number == key_index.PENDING
+            ]
+
+        if new_rows:
+            append_new_rows(sheet_name, new_rows)
+        for row_number, row in replacements:
+            loaders.replace_sheet_row(sheet_name, row_number, row)
+    except sqlite3.Error as error:
+        st.error(f"🚨 Could not queue the save: {error}")
+        return False
+
+    columns = storage.SHEET_COLUMNS[sheet_name]
+    for row in still_saving:
+        key = key_index.row_key(sheet_name, dict(zip(columns, row)))
+        st.warning(
+            f"⚠️ {' '.join(map(str, key))} is still being saved, please replace it again shortly"
+        )
+    for key in skipped:
+        st.warning(f"⚠️ {' '.join(map(str, key))} is already recorded and was skipped")
+
+    return bool(new_rows or replacements)
+
+
+def save_status():
+    statuses = loaders.load_save_queue().statuses(st.session_state.get("save_jobs", []))
+    if not statuses:
+        return
+
+    counts = {"queued": 0, "flushed": 0, "failed": 0, "abandoned": 0}
+    for job in statuses.values():
+        counts[job["status"]] += 1
+
+    st.caption(
+        f"🕒 {counts['queued']} queued · 🔁 {counts['failed']} retrying · "
+        f"✅ {counts['flushed']} saved · 🚨 {counts['abandoned']} not saved"
+    )
+    for job in statuses.values():
+        if job["status"] == "failed":
+            st.info(f"🔁 {job['sheet_name']} save will be retried: {job['error']}")
+        elif job["status"] == "abandoned":
+            st.warning(f"⚠️ {job['sheet_name']} save failed: {job['error']}")
+
+
+def show_errors(errors, labels=None):
+    for error in errors.itertuples(index=False):
+        label = f"Row {error.Row}" if labels is None else labels.get(error.Row)
+        st.error(f"🚨 {label}: {error.Error}" if label else f"🚨 {error.Error}")
+
+
+def save_costs(cost_rows, selected_month, selected_year):
+    with st.spinner("Validating form..."):
+        valid_costs, cost_errors = validation.validate(
+            cost_rows,
+            validation.COSTS_SCHEMA,
+            skip_if_blank=list(validation.COSTS_SCHEMA),
+        )
+
+    show_errors(cost_errors)
+
+    if cost_errors.empty and not valid_costs.empty:
+        timestamp = fx.get_timestamp()
+        data_date = fx.get_data_date(selected_month, selected_year)
+
+        costs_for_insertion = [
+            [
+                timestamp,
+                selected_month,
+                cost["Cost Item"],
+                cost["Amount"],
+                cost["Narrative"],
+                selected_year,
+                data_date,
+            ]
+            for cost in valid_costs.to_dict("records")
+        ]
+
+        loaders.append_to_sheet("Costs", costs_for_insertion)
+
+        st.success("✅ Cost data queued for saving. Feel free to close the application")
+
+
+def save_payments(payment_rows, labels=None):
+    with st.spinner("Validating Payments Form..."):
+        valid_payments, payment_errors = validation.validate(
+            payment_rows,
+            validation.PAYMENTS_SCHEMA,
+            context={"names": fx.get_all_names(), "years": fx.get_years_since_2022()},
+            skip_if_blank=["Amount Deposited"],
+        )
+
+    show_errors(payment_errors, labels=labels)
+
+    if payment_errors.empty and not valid_payments.empty:
+        timestamp = fx.get_timestamp()
+
+        payments_for_insertion = [
+            [
+                timestamp,
+                payment["Month"],
+                payment["Name"],
+                payment["Amount Deposited"],
+                int(payment["Year"]),
+                fx.get_data_date(payment["Month"], int(payment["Year"])),
+            ]
+            for payment in valid_payments.to_dict("records")
+        ]
+
+        if save_keyed_rows("Payments", payments_for_insertion):
+            st.success(
+                "✅ Payments queued for saving. Feel free to close the application"
+            )
+
+
+def costs_grid(months, years):
+    with st.form(key="costs_grid", clear_on_submit=True):
+        month, year = st.columns(2)
+
+        with month:
+            selected_month = st.selectbox("Month", months)
+
+        with year:
+            selected_year = st.selectbox("Year", years)
+
+        cost_rows = st.data_editor(
+            pd.DataFrame(columns=list(validation.COSTS_SCHEMA), dtype="string"),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Amount": st.column_config.TextColumn("Amount", help="ugx"),
+            },
+        )
+
+        if st.form_submit_button("Save"):
+            save_costs(cost_rows.reset_index(drop=True), selected_month, selected_year)
+
+
+def payments_grid(names, months, years):
+    with st.form(key="payments_grid", clear_on_submit=True):
+        month, year = st.columns(2)
+
+        with month:
+            selected_month = st.selectbox("Month", months)
+
+        with year:
+            selected_year = st.selectbox("Year", years)
+
+        payment_rows = st.data_editor(
+            pd.DataFrame(
+                {
+                    "Name": names,
+                    "Amount Deposited": pd.Series([""] * len(names), dtype="string"),
+                }
+            ),
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Name": st.column_config.SelectboxColumn("Name", options=names),
+                "Amount Deposited": st.column_config.TextColumn("Amount", help="ugx"),
+            },
+        )
+
+        if st.form_submit_button("Save"):
+            payment_rows = payment_rows.reset_index(drop=True).assign(
+                Month=selected_month, Year=selected_year
+            )
+            save_payments(payment_rows)
+
+
+def entry_mode(key):
+    return st.radio(
+        "Entry mode",
+        ["Form", "Grid"],
+        horizontal=True,
+        key=key,
+        label_visibility="collapsed",
+    )
+
+
+def page(current_user, payments_df, uap_df, costs_df):
+    years = fx.get_years_since_2022()
+    months = fx.get_all_months()
+
+    save_status()
+
+    st.radio(
+        "When an entry for that month is already recorded",
+        ["Skip", "Replace"],
+        horizontal=True,
+        key="duplicate_policy",
+    )
+
+    # Only the open section is built, unlike st.tabs, which runs every tab.
+    section = st.radio(
+        "Section",
+        ["📕 Costs", "📗 Payments", "💹 UAP"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="data_entry_section",
+    )
+
+    if section == "📕 Costs":
+        st.title(":red[Costs]")
+        if entry_mode("costs_entry_mode") == "Grid":
+            costs_grid(months, years)
+        else:
+            with st.form(key="costs", clear_on_submit=True):
+                st.markdown(
+                    "**Hi Alvin, please choose the month and year for which you are entering data**"
+                )
+
+                month, year = st.columns(2)
+
+                with month:
+                    selected_month = st.selectbox("Month", months)
+
+                with year:
+                    selected_year = st.selectbox("Year", years)
+
+                st.write("---")
+
+                st.markdown("**Monthly Fund Costs**")
+
+                item, amount, narrative = st.columns(3)
+
+                item.markdown("_Cost Item_")
+                amount.markdown("_Amount_")
+                narrative.markdown("_Narrative_")
+
+                identifier = dict()
+
+                counter = 1
+
+                for i in range(0, 3):
+                    item_key = f"cost_key{counter}"
+                    amount_key = f"cost_key{counter + 1}"
+                    narrative_key = f"cost_key{counter + 2}"
+
+                    identifier[i] = [item_key, amount_key, narrative_key]
+
+                    with item:
+                        st.text_input(
+                            label=" ",
+                            label_visibility="collapsed",
+                            disabled=False,
+                            key=item_key,
+                        )
+                    with amount:
+                        st.text_input(
+                            placeholder="ugx",
+                            label=" ",
+                            label_visibility="collapsed",
+                            disabled=False,
+                            key=amount_key,
+                        )
+                    with narrative:
+                        st.text_input(
+                            label=" ",
+                            label_visibility="collapsed",
+                            disabled=False,
+                            key=narrative_key,
+                        )
+
+                    counter += 3
+
+                submitted = st.form_submit_button("Save")
+
+                if submitted:
+                    cost_rows = pd.DataFrame(
+                        [
+                            [st.session_state.get(key, "") for key in input_list]
+                            for input_list in identifier.values()
+                        ],
+                        columns=list(validation.COSTS_SCHEMA),
+                    )
+
+                    save_costs(cost_rows, selected_month, selected_year)
+    if section == "📗 Payments":
+        names = fx.get_all_names()
+
+        st.title(":blue[Payments]")
+
+        if entry_mode("payments_entry_mode") == "Grid":
+            payments_grid(names, months, years)
+        else:
+            with st.form(key="payments", clear_on_submit=True):
+                st.markdown(
+                    "**Hi Alvin, please choose the month and year for which you are entering data**"
+                )
+
+                month, year = st.columns(2)
+
+                with month:
+                    selected_month = st.selectbox("Month", months)
+
+                with year:
+                    selected_year = st.selectbox("Year", years)
+
+                st.write("---")
+
+                st.markdown("**Member Payments**")
+
+                name_column, amount = st.columns(2)
+
+                name_column.markdown("_Name_")
+                amount.markdown("_Amount_")
+
+                name_input = dict()
+
+                emoji_options = ["😃", "😄", "🐪", "😊", "🙂", "😎", "💰", "😁"]
+
+                counter = 1
+
+                for name in names:
+                    amount_key = f"payments_key{counter}"
+
+                    name_input[name] = amount_key
+
+                    emoji = random.choice(emoji_options)
+
+                    with name_column:
+                        st.write(emoji, " ", name)
+                        st.write("")
+                    with amount:
+                        st.text_input(
+                            placeholder="ugx",
+                            label=" ",
+                            label_visibility="collapsed",
+                            disabled=False,
+                            key=amount_key,
+                        )
+
+                    counter += 1
+
+                submitted = st.form_submit_button("Save")
+
+                if submitted:
+                    payment_rows = pd.DataFrame(
+                        {
+                            "Name": list(name_input),
+                            "Month": selected_month,
+                            "Year": selected_year,
+                            "Amount Deposited": [
+                                st.session_state.get(amount_key, "")
+                                for amount_key in name_input.values()
+                            ],
+                        }
+                    )
+
+                    save_payments(
+                        payment_rows,
+                        labels=dict(enumerate(payment_rows["Name"], 1)),
+                    )
+
+        with st.expander("📥 Bulk import payments from CSV or Excel"):
+            st.caption(
+                "_Columns: Name, Month, Year, Amount Deposited. Valid rows are saved, invalid rows are listed below._"
+            )
+            uploaded_file = st.file_uploader(
+                "Bank export", type=["csv", "xlsx"], key="bulk_payments"
+            )
+
+            if uploaded_file is not None and st.button("Import payments"):
+                queued_imports, skipped_imports = [], []
+                import_errors = None
+
+                # Each chunk goes through the save queue like a form submit,
+                # so what was queued before an error is still saved, and the
+                # cached data is refreshed once the worker has written it.
+                def import_rows(sheet_name, rows):
+                    new_rows, _, skipped = split_duplicates(sheet_name, rows, "Skip")
+                    if new_rows:
+                        append_new_rows(sheet_name, new_rows)
+                        queued_imports.extend(new_rows)
+                    skipped_imports.extend(skipped)
+
+                with st.spinner("Importing payments..."), instrumentation.span(
+                    "save", "bulk import"
+                ):
+                    try:
+                        _, import_errors = bulk_import.import_payments(
+                            bulk_import.read_chunks(uploaded_file, uploaded_file.name),
+                            names,
+                            years,
+                            import_rows,
+                            timestamp=fx.get_timestamp(),
+                        )
+                    except ImportError:
+                        st.error(
+                            "🚨 Excel files need the openpyxl package, please upload a CSV export instead"
+                        )
+                    except ValueError as error:
+                        st.error(f"🚨 {error}")
+                    except sqlite3.Error as error:
+                        st.error(f"🚨 The import stopped partway: {error}")
+
+                if queued_imports:
+                    st.success(f"✅ {len(queued_imports)} payments queued for saving")
+                if skipped_imports:
+                    st.warning(
+                        f"⚠️ {len(skipped_imports)} payments were already recorded and were skipped"
+                    )
+                if import_errors is not None and not import_errors.empty:
+                    st.error(f"🚨 {len(import_errors)} problems found")
+                    st.dataframe(
+                        import_errors,
+                        use_container_width=True,
+                        hide_index=True,
+                    )
+    if section == "💹 UAP":
+        st.title(":green[UAP]")
+
+        with st.form(key="UAP", clear_on_submit=True):
+            st.markdown(
+                "**Hi Alvin, please choose the month and year for which you are entering data**"
+            )
+
+            month, year = st.columns(2)
+
+            with month:
+                selected_month = st.selectbox("Month", months)
+
+            with year:
+                selected_year = st.selectbox("Year", years)
+
+            st.write("---")
+
+            st.markdown("**UAP Portfolio Monthly Details**")
+
+            st.caption("_As shown in the Investment Statement_")
+
+            counter = 0
+
+            opening_key = f"uap_key{counter}"
+            closing_key = f"uap_key{counter + 1}"
+            interest_key = f"uap_key{counter + 2}"
+
+            holder_column, dummy_column = st.columns(2)
+
+            with holder_column:
+                st.text_input(
+                    label="Opening Balance",
+                    placeholder="ugx",
+                    disabled=False,
+                    help="Please enter a value greater than zero",
+                    key=opening_key,
+                )
+
+                st.text_input(
+                    placeholder="ugx",
+                    label="Closing Balance",
+                    disabled=False,
+                    help="Please enter a value greater than zero",
+                    key=closing_key,
+                )
+
+                st.text_input(
+                    label="Interest Rate",
+                    placeholder="%",
+                    help="Please enter a value greater than zero",
+                    disabled=False,
+                    key=interest_key,
+                )
+
+            submitted = st.form_submit_button("Save")
+
+            if submitted:
+                uap_rows = pd.DataFrame(
+                    {
+                        "Opening Balance": [st.session_state.get(opening_key, "")],
+                        "Closing Balance": [st.session_state.get(closing_key, "")],
+                        "Interest rate": [st.session_state.get(interest_key, "")],
+                    }
+                )
+
+                with st.spinner("🔍 Validating form..."):
+                    valid_uap, uap_errors = validation.validate(
+                        uap_rows, validation.UAP_SCHEMA
+                    )
+
+                show_errors(uap_errors, labels={})
+
+                if uap_errors.empty:
+                    st.info("👍 Form is Valid")
+
+                    uap_entry = valid_uap.to_dict("records")[0]
+
+                    data = [
+                        fx.get_timestamp(),
+                        selected_month,
+                        selected_year,
+                        uap_entry["Closing Balance"],
+                        uap_entry["Opening Balance"],
+                        uap_entry["Interest rate"],
+                        fx.get_data_date(selected_month, selected_year),
+                    ]
+
+                    reconciliation_issues = reconciliation.check_new_month(
+                        uap_df,
+                        payments_df,
+                        costs_df,
+                        dict(zip(storage.SHEET_COLUMNS["UAP Portfolio"][1:], data[1:])),
+                    )
+                    for issue in reconciliation_issues:
+                        st.warning(f"⚠️ Please double-check: {issue}")
+
+                    if save_keyed_rows("UAP Portfolio", [data]):
+                        st.success(
+                            "✅ UAP data queued for saving. Feel free to close the application"
+                        )
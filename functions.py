@@ -7,11 +7,12 @@ Created on Thu May 25 19:59:24 2023
 
 import calendar
 import uuid
-from datetime import date
+from datetime import date, datetime
 
 import gspread
 import streamlit as st
 import streamlit_authenticator as stauth
+from pytz import timezone
 
 
 def get_years_since_2022():
@@ -41,6 +42,16 @@ def get_all_names():
     return names
 
 
+def get_timestamp():
+    return datetime.now(timezone("Africa/Nairobi")).strftime(
+        "%d-%b-%Y %H:%M:%S" + " EAT"
+    )
+
+
+def get_data_date(month, year):
+    return str(datetime.strptime(f"1 {month} {year}", "%d %B %Y").date())
+
+
 def create_guid():
     guid = uuid.uuid4()
     return guid
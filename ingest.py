@@ -0,0 +1,95 @@
+import calendar
+
+import pandas as pd
+
+MONTH_DTYPE = pd.CategoricalDtype(list(calendar.month_name)[1:], ordered=True)
+
+SCHEMAS = {
+    "Payments": {
+        "Timestamp": "string[pyarrow]",
+        "Month": MONTH_DTYPE,
+        "Name": "category",
+        "Amount Deposited": "float64",
+        "Year": "Int16",
+        "Payment Month": "datetime64[ns]",
+    },
+    "UAP Portfolio": {
+        "Timestamp": "string[pyarrow]",
+        "Month": MONTH_DTYPE,
+        "Year": "Int16",
+        "Closing Balance": "float64",
+        "Opening Balance": "float64",
+        "Interest rate": "float64",
+        "Data Date": "datetime64[ns]",
+    },
+    "Costs": {
+        "Timestamp": "string[pyarrow]",
+        "Month": MONTH_DTYPE,
+        "Cost Item": "category",
+        "Amount": "float64",
+        "Narrative": "string[pyarrow]",
+        "Year": "Int16",
+        "Data Date": "datetime64[ns]",
+    },
+}
+
+
+def memory_usage(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def cast_column(column, dtype):
+    if dtype == "datetime64[ns]":
+        return pd.to_datetime(column, errors="coerce")
+    if dtype in ("float64", "Int16"):
+        numbers = pd.to_numeric(column, errors="coerce")
+        if dtype == "Int16":
+            numbers = numbers.round()
+        return numbers.astype(dtype)
+    return column.astype("string").str.strip().astype(dtype)
+
+
+def ingest(sheet_name, raw_frame):
+    schema = SCHEMAS[sheet_name]
+
+    # get_as_dataframe pads the frame with the sheet's blank trailing rows
+    # and unnamed columns, so those are dropped before anything is cast.
+    frame = raw_frame.dropna(how="all").dropna(axis=1, how="all")
+    frame = frame.loc[:, ~frame.columns.astype(str).str.startswith("Unnamed")]
+
+    typed_frame = frame.copy()
+    for column, dtype in schema.items():
+        if column in typed_frame.columns:
+            typed_frame[column] = cast_column(typed_frame[column], dtype)
+        else:
+            typed_frame[column] = pd.Series(dtype=dtype, index=typed_frame.index)
+
+    # Kept with the frame so the admin panel can show what the schema saves.
+    typed_frame.attrs["memory"] = {
+        "raw_bytes": memory_usage(raw_frame),
+        "typed_bytes": memory_usage(typed_frame),
+    }
+    return typed_frame
+
+
+def append(sheet_name, typed_frame, new_typed_frame):
+    if typed_frame.empty:
+        return new_typed_frame
+
+    combined = pd.concat([typed_frame, new_typed_frame])
+    combined.attrs = dict(typed_frame.attrs)
+    combined.attrs["memory"] = {
+        key: typed_frame.attrs["memory"][key] + new_typed_frame.attrs["memory"][key]
+        for key in typed_frame.attrs["memory"]
+    }
+    # concat falls back to object when two categoricals disagree on their
+    # categories, so those columns are recast over the union of both.
+    for column, dtype in SCHEMAS[sheet_name].items():
+        if dtype == "category":
+            categories = typed_frame[column].cat.categories.union(
+                new_typed_frame[column].cat.categories
+            )
+            combined[column] = combined[column].astype(
+                pd.CategoricalDtype(categories)
+            )
+    return combined
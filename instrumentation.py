@@ -0,0 +1,122 @@
+import functools
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# Each Streamlit session runs its script on its own thread, so every rerun
+# records into a thread-local Rerun. Calls made outside a rerun, such as the
+# save queue worker or the statements CLI, are not recorded.
+local = threading.local()
+
+# Seconds each stage, and the whole rerun, may take before it is flagged.
+TIME_BUDGET = {"startup": 0.3, "load": 1.0, "render": 1.0, "total": 2.0}
+
+
+class Rerun:
+    def __init__(self, page=None):
+        self.page = page
+        self.started = time.perf_counter()
+        self.spans = []
+        self.counters = Counter()
+
+    def record(self):
+        stages = Counter()
+        for span in self.spans:
+            stages[span["stage"]] += span["seconds"]
+
+        caches = {}
+        for counter, value in self.counters.items():
+            if counter.startswith("cache.") and counter.endswith(".calls"):
+                name = counter[len("cache.") : -len(".calls")]
+                misses = self.counters[f"cache.{name}.misses"]
+                caches[name] = {"hits": value - misses, "misses": misses}
+
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "page": self.page,
+            "total_seconds": time.perf_counter() - self.started,
+            "stages": dict(stages),
+            "spans": self.spans,
+            "counters": {
+                counter: value
+                for counter, value in self.counters.items()
+                if not counter.startswith("cache.")
+            },
+            "caches": caches,
+        }
+
+
+def start_rerun(page=None):
+    local.rerun = Rerun(page)
+    return local.rerun
+
+
+def current():
+    return getattr(local, "rerun", None)
+
+
+def count(counter, amount=1):
+    rerun = current()
+    if rerun is not None:
+        rerun.counters[counter] += amount
+
+
+@contextmanager
+def span(stage, name=None):
+    rerun = current()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if rerun is not None:
+            rerun.spans.append(
+                {
+                    "stage": stage,
+                    "name": name or stage,
+                    "seconds": time.perf_counter() - start,
+                }
+            )
+
+
+def cached(cache_decorator, name):
+    # Streamlit does not report cache hits, so the cached function counts its
+    # own runs as misses and the wrapper around it counts every lookup.
+    def decorate(function):
+        @functools.wraps(function)
+        def compute(*args, **kwargs):
+            count(f"cache.{name}.misses")
+            return function(*args, **kwargs)
+
+        cached_function = cache_decorator(compute)
+
+        @functools.wraps(function)
+        def lookup(*args, **kwargs):
+            count(f"cache.{name}.calls")
+            return cached_function(*args, **kwargs)
+
+        lookup.clear = cached_function.clear
+        return lookup
+
+    return decorate
+
+
+def finish(log_path=None, budget=None):
+    rerun = current()
+    if rerun is None:
+        return None
+    local.rerun = None
+
+    record = rerun.record()
+    timings = {**record["stages"], "total": record["total_seconds"]}
+    record["over_budget"] = [
+        stage
+        for stage, limit in (budget or {}).items()
+        if timings.get(stage, 0.0) > limit
+    ]
+    if log_path:
+        with open(log_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+    return record
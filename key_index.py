@@ -0,0 +1,86 @@
+import threading
+
+KEY_COLUMNS = {
+    "Payments": ["Name", "Month", "Year"],
+    "UAP Portfolio": ["Month", "Year"],
+}
+
+PENDING = -1
+
+
+def frame_keys(sheet_name, frame):
+    keyed = frame.dropna(subset=KEY_COLUMNS[sheet_name])
+    columns = [
+        keyed[column].astype(int) if column == "Year" else keyed[column].astype(str)
+        for column in KEY_COLUMNS[sheet_name]
+    ]
+    return dict(zip(zip(*columns), keyed.index))
+
+
+def row_key(sheet_name, row):
+    return tuple(
+        int(row[column]) if column == "Year" else str(row[column])
+        for column in KEY_COLUMNS[sheet_name]
+    )
+
+
+class KeyIndex:
+    # Maps each natural key already in a sheet to its sheet row. Keys saved
+    # since the last load are held as PENDING, with the save queue job that
+    # carries them, so that a double submit is caught before the save queue
+    # has flushed.
+
+    def __init__(self, sheet_name):
+        self.sheet_name = sheet_name
+        self.rows = {}
+        self.pending = {}
+        self.data_version = None
+        self.lock = threading.Lock()
+
+    def refresh(self, frame, data_version):
+        with self.lock:
+            if data_version == self.data_version:
+                return
+            self.rows = frame_keys(self.sheet_name, frame)
+            self.pending = {
+                key: job_id
+                for key, job_id in self.pending.items()
+                if key not in self.rows
+            }
+            self.data_version = data_version
+
+    def claim(self, key):
+        # Returns the existing row (or PENDING) for a key, and reserves the
+        # key if it is new so that a second claim in the same batch collides.
+        with self.lock:
+            if key in self.pending:
+                return PENDING
+            if key in self.rows:
+                return self.rows[key]
+            self.pending[key] = None
+            return None
+
+    def assign(self, keys, job_id):
+        with self.lock:
+            for key in keys:
+                if key in self.pending:
+                    self.pending[key] = job_id
+
+    def release(self, keys):
+        # For claims whose rows never made it into the queue.
+        with self.lock:
+            for key in keys:
+                self.pending.pop(key, None)
+
+    def pending_jobs(self):
+        with self.lock:
+            return {job_id for job_id in self.pending.values() if job_id is not None}
+
+    def release_jobs(self, job_ids):
+        # For claims whose save queue job failed for good.
+        with self.lock:
+            self.pending = {
+                key: job_id
+                for key, job_id in self.pending.items()
+                if job_id not in job_ids
+            }
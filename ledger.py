@@ -0,0 +1,135 @@
+import threading
+
+import pandas as pd
+
+LEDGER_COLUMNS = ["Date", "Type", "Description", "Amount", "Balance"]
+
+# Same-day entries are ordered deposits first, then interest, then costs.
+TYPE_ORDER = {"Payment": 0, "Interest": 1, "Cost": 2}
+
+SOURCES = {
+    "Payments": ("Payment", "Payment Month", "Name", "Amount Deposited", 1),
+    "Costs": ("Cost", "Data Date", "Cost Item", "Amount", -1),
+}
+
+
+def new_state():
+    return {
+        "lock": threading.Lock(),
+        "ledger": pd.DataFrame(columns=LEDGER_COLUMNS),
+        "totals": {entry_type: 0.0 for entry_type in TYPE_ORDER},
+        "seen": {},
+    }
+
+
+def uap_entries(uap_df):
+    earned = uap_df["Opening Balance"] * uap_df["Interest rate"]
+    earned = earned.fillna(uap_df["Closing Balance"] - uap_df["Opening Balance"])
+    return pd.DataFrame(
+        {
+            "Date": uap_df["Data Date"],
+            "Type": "Interest",
+            "Description": "UAP interest",
+            "Amount": earned,
+        }
+    )
+
+
+def source_entries(sheet_name, frame):
+    if sheet_name == "UAP Portfolio":
+        entries = uap_entries(frame)
+    else:
+        entry_type, date_column, description, amount, sign = SOURCES[sheet_name]
+        entries = pd.DataFrame(
+            {
+                "Date": frame[date_column],
+                "Type": entry_type,
+                "Description": frame[description].astype(str),
+                "Amount": frame[amount] * sign,
+            }
+        )
+    return entries.dropna(subset=["Date", "Amount"])
+
+
+def order(entries):
+    type_rank = entries["Type"].map(TYPE_ORDER)
+    return entries.assign(rank=type_rank).sort_values(
+        ["Date", "rank"], kind="stable"
+    ).drop(columns="rank")
+
+
+def totals_of(entries):
+    return entries.groupby("Type")["Amount"].sum().to_dict()
+
+
+def rebuild(state, frames):
+    entries = order(
+        pd.concat(
+            [source_entries(name, frame) for name, frame in frames.items()],
+            ignore_index=True,
+        )
+    ).reset_index(drop=True)
+    entries["Balance"] = entries["Amount"].cumsum()
+
+    state["ledger"] = entries
+    state["totals"] = {entry_type: 0.0 for entry_type in TYPE_ORDER}
+    state["totals"].update(totals_of(entries))
+
+
+def update(state, frames):
+    # frames maps sheet name to its typed frame, indexed by sheet row. Sheets
+    # only grow between full loads, so rows past the last one seen are new.
+    # New entries dated on or after the ledger's last entry are appended with
+    # the running balance carried on; anything else rebuilds the ledger.
+    with state["lock"]:
+        seen = state["seen"]
+        ledger = state["ledger"]
+        new_entries = []
+        needs_rebuild = False
+
+        for name, frame in frames.items():
+            generation = frame.attrs.get("generation")
+            previous = seen.get(name)
+            if previous is None or previous["generation"] != generation:
+                needs_rebuild = True
+                break
+            new_rows = frame[frame.index > previous["last_row"]]
+            if len(frame) - len(new_rows) != previous["rows"]:
+                needs_rebuild = True
+                break
+            new_entries.append(source_entries(name, new_rows))
+
+        if not needs_rebuild:
+            new_entries = order(pd.concat(new_entries, ignore_index=True))
+            if len(new_entries) and len(ledger):
+                needs_rebuild = new_entries["Date"].min() < ledger["Date"].iloc[-1]
+
+        if needs_rebuild:
+            rebuild(state, frames)
+        elif len(new_entries):
+            opening = ledger["Balance"].iloc[-1] if len(ledger) else 0.0
+            new_entries["Balance"] = opening + new_entries["Amount"].cumsum()
+            state["ledger"] = pd.concat([ledger, new_entries], ignore_index=True)
+            for entry_type, amount in totals_of(new_entries).items():
+                state["totals"][entry_type] += amount
+
+        for name, frame in frames.items():
+            seen[name] = {
+                "generation": frame.attrs.get("generation"),
+                "last_row": frame.index.max() if len(frame) else 0,
+                "rows": len(frame),
+            }
+
+        return state["ledger"], dict(state["totals"])
+
+
+def monthly(ledger):
+    if ledger.empty:
+        return pd.DataFrame(columns=["Month", *TYPE_ORDER, "Net Fund Value"])
+    by_month = ledger.assign(Month=ledger["Date"].dt.to_period("M").dt.to_timestamp())
+    summary = by_month.pivot_table(
+        index="Month", columns="Type", values="Amount", aggfunc="sum", fill_value=0.0
+    ).reindex(columns=list(TYPE_ORDER), fill_value=0.0)
+    summary["Net Fund Value"] = by_month.groupby("Month")["Balance"].last()
+    summary.columns.name = None
+    return summary.reset_index()
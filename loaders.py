@@ -0,0 +1,215 @@
+import pandas as pd
+import streamlit as st
+
+import aggregates
+import instrumentation
+import key_index
+import ledger
+import projection
+import save_queue
+import sheets_client
+import storage
+import sync
+
+REVISION_PROBE_TTL = st.secrets.get("revision_probe_ttl", 15)
+
+
+def load_data():
+    storage_backend = load_storage()
+    # Starts the flush worker, so jobs left in the journal by an earlier
+    # process are saved without waiting for someone to open Data Entry.
+    load_save_queue()
+    payments_df, uap_df, costs_df = fetch_frames(get_data_version())
+
+    # Each session gets its own shallow copies, so that with copy-on-write
+    # (set in Analysis.py) a write to one copies it instead of changing the
+    # frames every session shares.
+    return (
+        payments_df.copy(deep=False),
+        uap_df.copy(deep=False),
+        costs_df.copy(deep=False),
+        storage_backend,
+    )
+
+
+@instrumentation.cached(
+    st.cache_resource(max_entries=4, show_spinner="Loading fund data..."),
+    "fetch_frames",
+)
+def fetch_frames(data_version):
+    # Held once per process rather than copied into each session; callers
+    # treat the frames as read-only.
+    local_version, revision = data_version
+    state = sync_state()
+
+    # A revision that is neither the last one synced nor the one seen right
+    # after this app's own flush means the spreadsheet was edited directly,
+    # possibly in earlier rows, so it is reloaded in full.
+    full_reload = revision not in (state.get("revision"), state.get("flushed_revision"))
+    state["revision"] = revision
+
+    frames = sync.sync_frames(
+        load_storage(),
+        ["Payments", "UAP Portfolio", "Costs"],
+        state,
+        full_reload=full_reload,
+    )
+
+    return frames["Payments"], frames["UAP Portfolio"], frames["Costs"]
+
+
+def memory_report():
+    # Bytes each sheet took as read and after ingest cast it to its schema.
+    frames = fetch_frames(get_data_version())
+    return pd.DataFrame(
+        [
+            {
+                "Sheet": sheet_name,
+                "Rows": len(frame),
+                "Raw MB": frame.attrs["memory"]["raw_bytes"] / 1e6,
+                "Typed MB": frame.attrs["memory"]["typed_bytes"] / 1e6,
+            }
+            for sheet_name, frame in zip(["Payments", "UAP Portfolio", "Costs"], frames)
+        ]
+    )
+
+
+@st.cache_resource
+def sync_state():
+    return sync.new_state()
+
+
+@instrumentation.cached(
+    st.cache_resource(max_entries=2, show_spinner=False), "load_cube"
+)
+def load_cube(data_version):
+    # Built once per data version and shared read-only by every session.
+    payments_df, uap_df, costs_df = fetch_frames(data_version)
+    fund_ledger, ledger_totals = ledger.update(
+        ledger_state(),
+        {"Payments": payments_df, "UAP Portfolio": uap_df, "Costs": costs_df},
+    )
+    return aggregates.build_cube(
+        payments_df, uap_df, costs_df, fund_ledger, ledger_totals
+    )
+
+
+@instrumentation.cached(
+    st.cache_resource(max_entries=4, show_spinner="Simulating fund growth..."),
+    "load_projection",
+)
+def load_projection(data_version, years):
+    # Starts from each member's allocated fund value and bootstraps the
+    # monthly UAP rates seen so far.
+    payments_df, uap_df, _ = fetch_frames(data_version)
+    cube = load_cube(data_version)
+    return projection.project(
+        uap_df["Interest rate"],
+        cube["allocation"]["summary"]["Fund Value"],
+        projection.contribution_pattern(payments_df),
+        years=years,
+        paths=st.secrets.get("projection_paths", 100_000),
+    )
+
+
+@st.cache_resource
+def ledger_state():
+    return ledger.new_state()
+
+
+@st.cache_resource
+def data_version_store():
+    # Shared by every session so that a save in one session invalidates the
+    # cached frames for all of them.
+    return {"version": 0}
+
+
+@instrumentation.cached(
+    st.cache_data(ttl=REVISION_PROBE_TTL, show_spinner=False), "probe_revision"
+)
+def probe_revision():
+    return load_storage().revision()
+
+
+def get_data_version():
+    # Cached frames are keyed on the spreadsheet revision, so they are only
+    # reloaded when the data has actually changed.
+    return data_version_store()["version"], probe_revision()
+
+
+def invalidate_data():
+    data_version_store()["version"] += 1
+    probe_revision.clear()
+
+
+@st.cache_resource
+def load_workbook():
+    workbook = storage.open_workbook(
+        st.secrets["sheet_credentials"],
+        st.secrets["sheet_key"],
+        st.secrets.get("sheets_timeout", 60),
+    )
+    return sheets_client.SheetsClient(
+        workbook, st.secrets.get("sheets_requests_per_minute", 60)
+    )
+
+
+@st.cache_resource
+def load_storage():
+    if st.secrets.get("storage_backend", "sheets") == "sqlite":
+        return storage.SQLiteStorage(st.secrets.get("sqlite_path", "fraternity.db"))
+    return storage.SheetsStorage(load_workbook())
+
+
+@st.cache_resource
+def load_save_queue():
+    queue = save_queue.SaveQueue(st.secrets.get("save_queue_path", "save_queue.db"))
+    queue.start_worker(load_storage(), on_flush=after_flush)
+    return queue
+
+
+def flush_saves():
+    # Saves everything queued now rather than waiting for the worker.
+    flushed, updated = load_save_queue().flush(load_storage())
+    if flushed or updated:
+        after_flush(full_reload=bool(updated))
+
+
+def after_flush(full_reload=False):
+    state = sync_state()
+    state["flushed_revision"] = load_storage().revision()
+    if full_reload:
+        sync.reset(state)
+    invalidate_data()
+
+
+def append_to_sheet(sheet_name, rows):
+    # Saves go to the local journal and return at once; the background worker
+    # flushes them to the sheet and invalidates the cached frames.
+    with instrumentation.span("save", f"enqueue {sheet_name}"):
+        job_id = load_save_queue().enqueue(sheet_name, rows)
+    st.session_state.setdefault("save_jobs", []).append(job_id)
+    return job_id
+
+
+def replace_sheet_row(sheet_name, row_number, row):
+    with instrumentation.span("save", f"replace {sheet_name} row"):
+        job_id = load_save_queue().enqueue(sheet_name, [row], row_number=row_number)
+    st.session_state.setdefault("save_jobs", []).append(job_id)
+    return job_id
+
+
+@st.cache_resource
+def load_key_index(sheet_name):
+    return key_index.KeyIndex(sheet_name)
+
+
+def get_key_index(sheet_name):
+    data_version = get_data_version()
+    payments_df, uap_df, costs_df = fetch_frames(data_version)
+    frames = {"Payments": payments_df, "UAP Portfolio": uap_df}
+
+    index = load_key_index(sheet_name)
+    index.refresh(frames[sheet_name], data_version)
+    index.release_jobs(load_save_queue().abandoned(index.pending_jobs()))
+    return index
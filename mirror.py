@@ -0,0 +1,51 @@
+import argparse
+import json
+
+import sheets_client
+import storage
+
+
+def open_sheets(args):
+    with open(args.credentials) as file:
+        sheet_credentials = json.load(file)
+    workbook = storage.open_workbook(sheet_credentials, args.sheet_key)
+    return storage.SheetsStorage(
+        sheets_client.SheetsClient(workbook, args.requests_per_minute)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Copy the fund sheets between Google Sheets and a SQLite file."
+    )
+    parser.add_argument(
+        "direction",
+        choices=["pull", "push"],
+        help="pull copies Sheets into SQLite, push copies SQLite back to Sheets",
+    )
+    parser.add_argument("--credentials", required=True, help="service account JSON")
+    parser.add_argument("--sheet-key", required=True, help="spreadsheet key")
+    parser.add_argument("--sqlite", required=True, help="SQLite file to mirror")
+    parser.add_argument("--requests-per-minute", type=int, default=60)
+    parser.add_argument(
+        "--sheet",
+        action="append",
+        choices=list(storage.SHEET_COLUMNS),
+        help="only this sheet (default all)",
+    )
+    args = parser.parse_args()
+
+    sheets = open_sheets(args)
+    local = storage.SQLiteStorage(args.sqlite)
+    source, target = (sheets, local) if args.direction == "pull" else (local, sheets)
+
+    # Every row in the target sheet is replaced.
+    row_counts = storage.mirror(
+        source, target, args.sheet or tuple(storage.SHEET_COLUMNS)
+    )
+    for sheet_name, row_count in row_counts.items():
+        print(f"{sheet_name}: {row_count} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+def contribution_pattern(payments_df, months=12):
+    # Average monthly deposit per member over their most recent year.
+    payments = payments_df.dropna(subset=["Name", "Payment Month", "Amount Deposited"])
+    if payments.empty:
+        return pd.Series(dtype="float64")
+    cutoff = payments["Payment Month"].max() - pd.DateOffset(months=months - 1)
+    recent = payments[payments["Payment Month"] >= cutoff.normalize()]
+    totals = recent.groupby(recent["Name"].astype(str))["Amount Deposited"].sum()
+    return totals / months
+
+
+def simulate_growth(rates, months, paths, seed=None):
+    # growth[p, t] is the compounded return after month t on path p, and
+    # carried[p, t] the value after month t of depositing 1 at the start of
+    # every month so far. Every member's path is a mix of the two.
+    rng = np.random.default_rng(seed)
+    sampled = np.asarray(rates, dtype="float32")[
+        rng.integers(0, len(rates), size=(paths, months))
+    ]
+    growth = np.cumprod(1.0 + sampled, axis=1, dtype="float32")
+    # carried_t is the sum over s <= t of growth_t / growth_(s-1).
+    before = np.concatenate((np.ones((paths, 1), "float32"), growth[:, :-1]), axis=1)
+    carried = growth * np.cumsum(1.0 / before, axis=1, dtype="float32")
+    return growth, carried
+
+
+def project(
+    rates,
+    start_balances,
+    monthly_contributions,
+    years=10,
+    paths=100_000,
+    seed=None,
+    band_every=3,
+):
+    rates = pd.Series(rates).dropna().to_numpy()
+    months = years * 12
+    members = start_balances.index.union(monthly_contributions.index)
+    balances = start_balances.reindex(members, fill_value=0.0).astype("float32")
+    deposits = monthly_contributions.reindex(members, fill_value=0.0).astype("float32")
+
+    if len(rates) == 0:
+        rates = np.zeros(1)
+    growth, carried = simulate_growth(rates, months, paths, seed)
+
+    # Percentiles dominate the run time, so the fund is banded per quarter.
+    quarter_ends = np.arange(band_every, months + 1, band_every) - 1
+    fund = (
+        balances.sum() * growth[:, quarter_ends]
+        + deposits.sum() * carried[:, quarter_ends]
+    )
+    fund_bands = pd.DataFrame(
+        np.percentile(fund, PERCENTILES, axis=0).T,
+        columns=[f"P{percentile}" for percentile in PERCENTILES],
+    )
+    fund_bands.insert(0, "Month", quarter_ends + 1)
+
+    # Only the year-end paths are kept, so that any member can be banded on
+    # demand without banding every member up front.
+    year_ends = np.arange(12, months + 1, 12) - 1
+    return {
+        "fund": fund_bands,
+        "growth": growth[:, year_ends],
+        "carried": carried[:, year_ends],
+        "balances": balances,
+        "deposits": deposits,
+    }
+
+
+def member_bands(result, name):
+    if name not in result["balances"].index:
+        return None
+    values = (
+        result["balances"][name] * result["growth"]
+        + result["deposits"][name] * result["carried"]
+    )
+    return pd.DataFrame(
+        np.percentile(values, PERCENTILES, axis=0).T,
+        columns=[f"P{percentile}" for percentile in PERCENTILES],
+        index=pd.Index(np.arange(1, values.shape[1] + 1), name="Year"),
+    )
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+ISSUES = {
+    "Opening Mismatch": "opening balance differs from last month's closing balance",
+    "Closing Mismatch": "closing balance differs from opening balance plus interest and net deposits",
+    "Missing Month": "previous month is missing",
+    "Rate Outlier": "interest rate is unusual compared with history",
+}
+
+
+def monthly_net_deposits(payments_df, costs_df):
+    deposits = payments_df.groupby(payments_df["Payment Month"].dt.to_period("M"))[
+        "Amount Deposited"
+    ].sum()
+    costs = costs_df.groupby(costs_df["Data Date"].dt.to_period("M"))["Amount"].sum()
+    return deposits.sub(costs, fill_value=0.0)
+
+
+def robust_z_scores(rates, reference):
+    median = reference.median()
+    mad = (reference - median).abs().median()
+    if not mad or np.isnan(mad):
+        return pd.Series(0.0, index=rates.index)
+    return 0.6745 * (rates - median) / mad
+
+
+def reconcile(
+    uap_df,
+    payments_df,
+    costs_df,
+    tolerance=0.01,
+    outlier_threshold=3.5,
+    rate_reference=None,
+):
+    # Every check compares a month with the month before it through shift(),
+    # so the whole history is reconciled in one vectorized pass.
+    uap = uap_df.dropna(subset=["Data Date"]).sort_values("Data Date")
+    uap = uap.groupby(uap["Data Date"].dt.to_period("M")).last()
+    months = uap.index
+
+    opening = uap["Opening Balance"]
+    closing = uap["Closing Balance"]
+    rate = uap["Interest rate"]
+    net_deposits = monthly_net_deposits(payments_df, costs_df).reindex(
+        months, fill_value=0.0
+    )
+
+    previous_closing = closing.shift()
+    expected_closing = opening * (1 + rate) + net_deposits
+    allowed = tolerance * opening.abs().clip(lower=1.0)
+    ordinals = pd.Series(months.asi8, index=months)
+
+    report = pd.DataFrame(
+        {
+            "Month": months.to_timestamp(),
+            "Opening Balance": opening,
+            "Closing Balance": closing,
+            "Interest rate": rate,
+            "Previous Closing": previous_closing,
+            "Net Deposits": net_deposits,
+            "Expected Closing": expected_closing,
+            "Opening Mismatch": (opening - previous_closing).abs() > allowed,
+            "Closing Mismatch": (closing - expected_closing).abs() > allowed,
+            "Missing Month": ordinals.diff() > 1,
+            "Rate Outlier": robust_z_scores(
+                rate, rate if rate_reference is None else rate_reference
+            ).abs()
+            > outlier_threshold,
+        }
+    ).reset_index(drop=True)
+
+    report["Issues"] = ""
+    for flag, description in ISSUES.items():
+        report["Issues"] += np.where(report[flag], description + "; ", "")
+    report["Issues"] = report["Issues"].str.rstrip("; ")
+    return report
+
+
+def flagged(report):
+    return report[report["Issues"] != ""]
+
+
+def check_new_month(uap_df, payments_df, costs_df, entry):
+    # Reconciles a single new month against the month before it, reusing the
+    # stored history only for the rate distribution.
+    new_date = pd.Timestamp(entry["Data Date"])
+    history = uap_df.dropna(subset=["Data Date"])
+    previous = history[history["Data Date"] < new_date].nlargest(1, "Data Date")
+
+    new_period = new_date.to_period("M")
+    month_payments = payments_df[
+        payments_df["Payment Month"].dt.to_period("M") == new_period
+    ]
+    month_costs = costs_df[costs_df["Data Date"].dt.to_period("M") == new_period]
+
+    report = reconcile(
+        pd.concat(
+            [
+                previous[list(entry)],
+                pd.DataFrame([entry]).astype({"Data Date": "datetime64[ns]"}),
+            ],
+            ignore_index=True,
+        ),
+        month_payments,
+        month_costs,
+        rate_reference=history["Interest rate"].dropna(),
+    )
+    last = report.iloc[-1]
+    return [description for flag, description in ISSUES.items() if last[flag]]
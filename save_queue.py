@@ -0,0 +1,218 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Failed jobs are retried after RETRY_DELAY seconds, doubling with each
+# attempt up to MAX_RETRY_DELAY, for as long as it takes.
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 15 * 60
+
+# Queued jobs for a sheet are sent together up to this many rows per
+# append_rows call. A larger job, such as a bulk import chunk, goes alone.
+MAX_APPEND_ROWS = 5000
+
+
+def may_have_applied(error):
+    # A server error, or a timeout or dropped connection with no response at
+    # all, does not mean the write failed, so retrying it could save the
+    # same rows twice. Such jobs are abandoned instead.
+    if isinstance(error, (requests.exceptions.Timeout, requests.ConnectionError)):
+        return True
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code is not None and status_code >= 500
+
+
+def retry_due(attempts, attempted_at, now):
+    if attempted_at is None:
+        return True
+    delay = min(RETRY_DELAY * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+    return now >= datetime.fromisoformat(attempted_at) + timedelta(seconds=delay)
+
+
+class SaveQueue:
+    # A durable, append-only journal of pending sheet appends. Form submits
+    # only write to the journal; a background worker flushes it to the
+    # storage backend in batches.
+
+    def __init__(self, path):
+        self.path = path
+        self.wakeup = threading.Event()
+        self.flush_lock = threading.Lock()
+        self.worker = None
+        with self.connect() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sheet_name TEXT NOT NULL,
+                    rows TEXT NOT NULL,
+                    row_number INTEGER,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    flushed_at TEXT,
+                    attempted_at TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(jobs)")}
+            if "attempted_at" not in columns:
+                # Journals from before retries backed off gave up after five
+                # attempts; those jobs stay given up.
+                connection.execute("ALTER TABLE jobs ADD COLUMN attempted_at TEXT")
+                connection.execute(
+                    "UPDATE jobs SET status = 'abandoned' "
+                    "WHERE status = 'failed' AND attempts >= 5"
+                )
+            connection.commit()
+
+    def connect(self):
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def enqueue(self, sheet_name, rows, row_number=None):
+        # Jobs with a row_number replace that sheet row instead of appending.
+        with self.connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO jobs (sheet_name, rows, row_number, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (sheet_name, json.dumps(rows), row_number, datetime.now().isoformat()),
+            )
+            connection.commit()
+        self.wakeup.set()
+        return cursor.lastrowid
+
+    def statuses(self, job_ids):
+        if not job_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self.connect() as connection:
+            rows = connection.execute(
+                f"SELECT id, sheet_name, status, error FROM jobs WHERE id IN ({placeholders})",
+                list(job_ids),
+            ).fetchall()
+        return {
+            job_id: {"sheet_name": sheet_name, "status": status, "error": error}
+            for job_id, sheet_name, status, error in rows
+        }
+
+    def abandoned(self, job_ids):
+        # Jobs that may or may not have reached the sheet, and are not retried.
+        if not job_ids:
+            return set()
+        placeholders = ", ".join("?" for _ in job_ids)
+        with self.connect() as connection:
+            rows = connection.execute(
+                f"SELECT id FROM jobs WHERE id IN ({placeholders}) "
+                "AND status = 'abandoned'",
+                list(job_ids),
+            ).fetchall()
+        return {job_id for job_id, in rows}
+
+    def flush(self, storage_backend):
+        # The worker and a session flushing directly must not both send the
+        # same queued jobs.
+        with self.flush_lock:
+            return self.flush_jobs(storage_backend)
+
+    def flush_jobs(self, storage_backend):
+        now = datetime.now()
+        with self.connect() as connection:
+            jobs = connection.execute(
+                "SELECT id, sheet_name, rows, row_number, attempts, attempted_at "
+                "FROM jobs WHERE status IN ('queued', 'failed') ORDER BY id"
+            ).fetchall()
+
+        batches = {}
+        updated = 0
+        for job_id, sheet_name, rows, row_number, attempts, attempted_at in jobs:
+            if not retry_due(attempts, attempted_at, now):
+                continue
+            if row_number is not None:
+                try:
+                    storage_backend.update_row(
+                        sheet_name, row_number, json.loads(rows)[0]
+                    )
+                except Exception as error:
+                    self.mark([job_id], "failed", error=str(error))
+                else:
+                    self.mark([job_id], "flushed")
+                    updated += 1
+                continue
+
+            rows = json.loads(rows)
+            sheet_batches = batches.setdefault(sheet_name, [])
+            if (
+                not sheet_batches
+                or len(sheet_batches[-1][1]) + len(rows) > MAX_APPEND_ROWS
+            ):
+                sheet_batches.append(([], []))
+            job_ids, batch_rows = sheet_batches[-1]
+            job_ids.append(job_id)
+            batch_rows.extend(rows)
+
+        flushed = 0
+        for sheet_name, sheet_batches in batches.items():
+            for job_ids, rows in sheet_batches:
+                try:
+                    storage_backend.append_rows(sheet_name, rows)
+                except Exception as error:
+                    if may_have_applied(error):
+                        self.mark(
+                            job_ids,
+                            "abandoned",
+                            error=f"{error} (not retried; check the sheet before re-entering)",
+                        )
+                    else:
+                        self.mark(job_ids, "failed", error=str(error))
+                else:
+                    self.mark(job_ids, "flushed")
+                    flushed += len(job_ids)
+        return flushed, updated
+
+    def mark(self, job_ids, status, error=None):
+        placeholders = ", ".join("?" for _ in job_ids)
+        now = datetime.now().isoformat()
+        flushed_at = now if status == "flushed" else None
+        with self.connect() as connection:
+            connection.execute(
+                f"UPDATE jobs SET status = ?, error = ?, flushed_at = ?, "
+                f"attempted_at = ?, attempts = attempts + 1 "
+                f"WHERE id IN ({placeholders})",
+                [status, error, flushed_at, now, *job_ids],
+            )
+            connection.commit()
+
+    def start_worker(self, storage_backend, on_flush=None, interval=30, batch_delay=2):
+        if self.worker is not None:
+            return
+        self.worker = threading.Thread(
+            target=self.run_worker,
+            args=(storage_backend, on_flush, interval, batch_delay),
+            daemon=True,
+        )
+        self.worker.start()
+
+    def run_worker(self, storage_backend, on_flush, interval, batch_delay):
+        while True:
+            self.wakeup.wait(interval)
+            # Give a burst of submits a moment to land so they share one flush.
+            time.sleep(batch_delay)
+            self.wakeup.clear()
+            # The journal keeps every job that has not flushed, so an error
+            # here is logged and the next pass tries again.
+            try:
+                flushed, updated = self.flush(storage_backend)
+                if (flushed or updated) and on_flush is not None:
+                    # Replacing an earlier row is invisible to the delta sync.
+                    on_flush(full_reload=bool(updated))
+            except Exception:
+                logger.exception("Save queue flush failed")
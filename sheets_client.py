@@ -0,0 +1,154 @@
+import threading
+import time
+
+import gspread
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential,
+    wait_random,
+)
+
+import instrumentation
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503}
+
+# A 5xx does not mean a write failed, so writes are only retried when the
+# quota turned them away, and everything not listed here counts as a write.
+READ_METHODS = {"values_batch_get", "worksheet", "get_all_values", "request"}
+
+
+class TokenBucket:
+    def __init__(self, requests_per_minute, capacity=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = capacity or requests_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def status_code(error):
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.response.status_code
+    return None
+
+
+def is_retryable(error):
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def is_rate_limited(error):
+    return status_code(error) == 429
+
+
+class SheetsClient:
+    # Wraps a gspread Spreadsheet so that every API call shares one token
+    # bucket and backs off on quota errors, and identical reads that are
+    # already in flight are answered by the first caller's response.
+
+    def __init__(self, workbook, requests_per_minute=60):
+        self.workbook = workbook
+        self.bucket = TokenBucket(requests_per_minute)
+        self.lock = threading.Lock()
+        self.in_flight = {}
+
+    @retry(
+        retry=retry_if_exception(is_retryable),
+        wait=wait_exponential(multiplier=1, max=32) + wait_random(0, 1),
+        stop=stop_after_attempt(6),
+        reraise=True,
+    )
+    def call(self, function, *args, **kwargs):
+        return self.send(function, *args, **kwargs)
+
+    @retry(
+        retry=retry_if_exception(is_rate_limited),
+        wait=wait_exponential(multiplier=1, max=32) + wait_random(0, 1),
+        stop=stop_after_attempt(6),
+        reraise=True,
+    )
+    def call_write(self, function, *args, **kwargs):
+        return self.send(function, *args, **kwargs)
+
+    def send(self, function, *args, **kwargs):
+        self.bucket.acquire()
+        instrumentation.count("google_api_calls")
+        instrumentation.count(f"google_api.{getattr(function, '__name__', 'call')}")
+        return function(*args, **kwargs)
+
+    def single_flight(self, key, function, *args, **kwargs):
+        with self.lock:
+            flight = self.in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = {"done": threading.Event(), "result": None, "error": None}
+                self.in_flight[key] = flight
+
+        if not is_leader:
+            flight["done"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["result"]
+
+        try:
+            flight["result"] = self.call(function, *args, **kwargs)
+        except Exception as error:
+            flight["error"] = error
+            raise
+        finally:
+            with self.lock:
+                del self.in_flight[key]
+            flight["done"].set()
+        return flight["result"]
+
+    def values_batch_get(self, ranges, params=None):
+        key = ("values_batch_get", tuple(ranges), tuple(sorted((params or {}).items())))
+        return self.single_flight(
+            key, self.workbook.values_batch_get, ranges, params=params
+        )
+
+    def worksheet(self, title):
+        worksheet = self.single_flight(
+            ("worksheet", title), self.workbook.worksheet, title
+        )
+        return ThrottledProxy(self, worksheet)
+
+    @property
+    def client(self):
+        return ThrottledProxy(self, self.workbook.client)
+
+    def __getattr__(self, name):
+        return getattr(ThrottledProxy(self, self.workbook), name)
+
+
+class ThrottledProxy:
+    def __init__(self, client, target):
+        self.client = client
+        self.target = target
+
+    def __getattr__(self, name):
+        attribute = getattr(self.target, name)
+        if not callable(attribute):
+            return attribute
+
+        call = self.client.call if name in READ_METHODS else self.client.call_write
+
+        def throttled(*args, **kwargs):
+            return call(attribute, *args, **kwargs)
+
+        return throttled
@@ -0,0 +1,184 @@
+import argparse
+import html
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import altair as alt
+import pandas as pd
+
+import aggregates
+import allocation
+import ledger
+import sheets_client
+import storage
+import sync
+
+SHEET_NAMES = ["Payments", "UAP Portfolio", "Costs"]
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.jsdelivr.net/npm/vega@5"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-lite@5"></script>
+<script src="https://cdn.jsdelivr.net/npm/vega-embed@6"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+.metrics td {{ font-size: 1.2em; }}
+</style>
+</head>
+<body>
+<h1>Fraternity Trust Fund</h1>
+<h2>{title}</h2>
+{metrics}
+<div id="balance"></div>
+<h3>Monthly Balance</h3>
+{monthly}
+<h3>Payments</h3>
+{payments}
+<script>vegaEmbed("#balance", {chart});</script>
+</body>
+</html>
+"""
+
+# Set in each worker process by init_worker, so the snapshot is pickled once
+# per worker instead of once per member.
+snapshot = None
+
+
+def open_storage(args):
+    if args.sqlite:
+        return storage.SQLiteStorage(args.sqlite)
+    with open(args.credentials) as file:
+        sheet_credentials = json.load(file)
+    workbook = storage.open_workbook(sheet_credentials, args.sheet_key)
+    return storage.SheetsStorage(
+        sheets_client.SheetsClient(workbook, args.requests_per_minute)
+    )
+
+
+def load_snapshot(storage_backend, statement_month=None):
+    # The same path the dashboard takes, minus the Streamlit caches.
+    frames = sync.sync_frames(storage_backend, SHEET_NAMES, sync.new_state())
+    fund_ledger, ledger_totals = ledger.update(ledger.new_state(), frames)
+    cube = aggregates.build_cube(
+        frames["Payments"],
+        frames["UAP Portfolio"],
+        frames["Costs"],
+        fund_ledger,
+        ledger_totals,
+    )
+
+    months = cube["allocation"]["balances"].columns
+    if statement_month is None:
+        statement_month = months.max() if len(months) else pd.Timestamp.now()
+    statement_month = pd.Timestamp(statement_month).to_period("M").to_timestamp()
+
+    return {
+        "month": statement_month,
+        "allocation": cube["allocation"],
+        "transactions": cube["transactions"],
+        "member_rows": cube["member_rows"],
+        "average_interest": cube["average_interest"],
+    }
+
+
+def init_worker(shared_snapshot):
+    global snapshot
+    snapshot = shared_snapshot
+
+
+def balance_chart(statement):
+    return (
+        alt.Chart(statement)
+        .mark_area(opacity=0.6)
+        .encode(
+            x=alt.X("Month:T", timeUnit="yearmonth"),
+            y=alt.Y("Balance:Q"),
+        )
+        .properties(title="Your balance by month", width=600)
+    )
+
+
+def render_statement(name, output_dir):
+    month = snapshot["month"]
+    statement = allocation.member_statement(snapshot["allocation"], name)
+    statement = statement[statement["Month"] <= month]
+    transactions = aggregates.member_transactions(snapshot, name)
+    paid_on = pd.to_datetime(
+        transactions["Month"].astype(str) + " " + transactions["Year"], format="%B %Y"
+    )
+    transactions = transactions[paid_on <= month]
+    current = statement[statement["Month"] == month]
+
+    metrics = pd.DataFrame(
+        {
+            "Total Paid": [statement["Deposited"].sum()],
+            "Interest Earned": [statement["Interest Earned"].sum()],
+            "Interest This Month": [current["Interest Earned"].sum()],
+            "Balance": [current["Balance"].sum()],
+            "Average Interest": ["{:.2%}".format(snapshot["average_interest"])],
+        }
+    )
+    monthly = statement.assign(Month=statement["Month"].dt.strftime("%b %Y"))
+
+    page = PAGE.format(
+        title=html.escape(f"{name} - Statement for {month:%B %Y}"),
+        metrics=metrics.to_html(
+            index=False, classes="metrics", float_format="{:,.2f}".format
+        ),
+        monthly=monthly.to_html(index=False, float_format="{:,.2f}".format),
+        payments=transactions.to_html(index=False, float_format="{:,.2f}".format),
+        chart=balance_chart(statement).to_json(),
+    )
+
+    path = os.path.join(
+        output_dir, f"{re.sub(r'[^A-Za-z0-9]+', '_', name)}_{month:%Y_%m}.html"
+    )
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(page)
+    return path
+
+
+def render_all(shared_snapshot, names, output_dir, workers=None):
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(shared_snapshot,)
+    ) as executor:
+        return list(executor.map(render_statement, names, [output_dir] * len(names)))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render monthly fund statements for every member."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--credentials", help="service account JSON file")
+    source.add_argument("--sqlite", help="read from a SQLite mirror instead")
+    parser.add_argument("--sheet-key", help="spreadsheet key, with --credentials")
+    parser.add_argument("--requests-per-minute", type=int, default=60)
+    parser.add_argument("--month", help="statement month as YYYY-MM (default latest)")
+    parser.add_argument("--member", action="append", help="only this member")
+    parser.add_argument("--output", default="statements")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    if args.credentials and not args.sheet_key:
+        parser.error("--sheet-key is required with --credentials")
+
+    shared_snapshot = load_snapshot(open_storage(args), args.month)
+    members = shared_snapshot["allocation"]["summary"].index
+    names = args.member or list(members)
+    unknown = [name for name in names if name not in members]
+    if unknown:
+        parser.error(f"no payments recorded for: {', '.join(unknown)}")
+    for path in render_all(shared_snapshot, names, args.output, args.workers):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
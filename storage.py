@@ -0,0 +1,207 @@
+import os
+import sqlite3
+from contextlib import closing
+
+import gspread
+import pandas as pd
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread_dataframe import set_with_dataframe
+
+SHEET_COLUMNS = {
+    "Payments": [
+        "Timestamp",
+        "Month",
+        "Name",
+        "Amount Deposited",
+        "Year",
+        "Payment Month",
+    ],
+    "UAP Portfolio": [
+        "Timestamp",
+        "Month",
+        "Year",
+        "Closing Balance",
+        "Opening Balance",
+        "Interest rate",
+        "Data Date",
+    ],
+    "Costs": [
+        "Timestamp",
+        "Month",
+        "Cost Item",
+        "Amount",
+        "Narrative",
+        "Year",
+        "Data Date",
+    ],
+}
+
+LAST_COLUMN = "Z"
+
+
+def values_to_frame(sheet_name, values, first_row=2):
+    if not values:
+        return pd.DataFrame(columns=SHEET_COLUMNS.get(sheet_name))
+
+    header, rows = values[0], values[1:]
+    # The API trims trailing blanks from each row, so rows are padded back out.
+    width = len(header)
+    rows = [row[:width] + [None] * (width - len(row)) for row in rows]
+    # Frames are indexed by sheet row number so that rows can be updated later.
+    index = pd.RangeIndex(first_row, first_row + len(rows), name="Sheet Row")
+    return pd.DataFrame(rows, columns=header, index=index).replace("", None)
+
+
+def open_workbook(sheet_credentials, sheet_key, timeout=60):
+    google_spreadsheet_client = gspread.service_account_from_dict(sheet_credentials)
+    # gspread waits forever by default, which would hang the save worker.
+    google_spreadsheet_client.set_timeout(timeout)
+    return google_spreadsheet_client.open_by_key(sheet_key)
+
+
+class SheetsStorage:
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self.worksheets = {}
+
+    def worksheet(self, sheet_name):
+        if sheet_name not in self.worksheets:
+            try:
+                self.worksheets[sheet_name] = self.workbook.worksheet(sheet_name)
+            except gspread.exceptions.WorksheetNotFound:
+                return None
+        return self.worksheets[sheet_name]
+
+    def read_values(self, first_rows):
+        # One values:batchGet request covers every sheet, instead of a
+        # worksheet lookup plus a full read per sheet. Each sheet is read from
+        # its given 1-based row onwards, so row 1 includes the header.
+        sheet_names = list(first_rows)
+        response = self.workbook.values_batch_get(
+            [
+                f"'{sheet_name}'!A{first_rows[sheet_name]}:{LAST_COLUMN}"
+                for sheet_name in sheet_names
+            ],
+            params={
+                "valueRenderOption": "UNFORMATTED_VALUE",
+                "dateTimeRenderOption": "FORMATTED_STRING",
+            },
+        )
+        return {
+            sheet_name: value_range.get("values", [])
+            for sheet_name, value_range in zip(sheet_names, response["valueRanges"])
+        }
+
+    def revision(self):
+        # Drive's modifiedTime changes on any edit to the spreadsheet,
+        # including edits made directly in Sheets, and costs one tiny request.
+        response = self.workbook.client.request(
+            "get",
+            f"{DRIVE_FILES_API_V3_URL}/{self.workbook.id}",
+            params={"fields": "modifiedTime", "supportsAllDrives": True},
+        )
+        return response.json()["modifiedTime"]
+
+    def append_rows(self, sheet_name, rows):
+        # Anchoring on A1 lets the Sheets append API find the end of the table
+        # itself, so a save never has to download the existing rows first.
+        self.worksheet(sheet_name).append_rows(
+            rows,
+            value_input_option="user_entered",
+            insert_data_option="insert_rows",
+            table_range="a1",
+        )
+
+    def update_row(self, sheet_name, row_number, row):
+        self.worksheet(sheet_name).update(
+            f"A{row_number}", [row], value_input_option="user_entered"
+        )
+
+    def replace_frame(self, sheet_name, frame):
+        worksheet = self.worksheet(sheet_name)
+        worksheet.clear()
+        set_with_dataframe(worksheet, frame)
+
+
+class SQLiteStorage:
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def table_exists(self, connection, sheet_name):
+        return connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (sheet_name,),
+        ).fetchone()
+
+    def read_values(self, first_rows):
+        values = {}
+        with self.connect() as connection:
+            for sheet_name, first_row in first_rows.items():
+                if not self.table_exists(connection, sheet_name):
+                    values[sheet_name] = []
+                    continue
+
+                # Row 1 is the header, as in the sheet, so data row n sits at
+                # OFFSET n - 2.
+                cursor = connection.execute(
+                    f'SELECT * FROM "{sheet_name}" ORDER BY rowid LIMIT -1 OFFSET ?',
+                    (max(first_row - 2, 0),),
+                )
+                rows = [list(row) for row in cursor.fetchall()]
+                if first_row <= 1:
+                    rows.insert(0, [column[0] for column in cursor.description])
+                values[sheet_name] = rows
+        return values
+
+    def revision(self):
+        if not os.path.exists(self.path):
+            return None
+        stat = os.stat(self.path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def append_rows(self, sheet_name, rows):
+        frame = pd.DataFrame(rows, columns=SHEET_COLUMNS[sheet_name])
+        self.write_frame(sheet_name, frame, if_exists="append")
+
+    def update_row(self, sheet_name, row_number, row):
+        with self.connect() as connection:
+            cursor = connection.execute(
+                f'SELECT rowid, * FROM "{sheet_name}" ORDER BY rowid LIMIT 1 OFFSET ?',
+                (row_number - 2,),
+            )
+            rowid = cursor.fetchone()[0]
+            columns = [column[0] for column in cursor.description][1:]
+            assignments = ", ".join(f'"{column}" = ?' for column in columns)
+            connection.execute(
+                f'UPDATE "{sheet_name}" SET {assignments} WHERE rowid = ?',
+                [*row, rowid],
+            )
+            connection.commit()
+
+    def replace_frame(self, sheet_name, frame):
+        self.write_frame(sheet_name, frame, if_exists="replace")
+
+    def write_frame(self, sheet_name, frame, if_exists):
+        with self.connect() as connection:
+            frame.to_sql(sheet_name, connection, if_exists=if_exists, index=False)
+            connection.commit()
+
+
+def read_frame(storage_backend, sheet_name):
+    # The whole sheet as stored, indexed by sheet row like every other read.
+    values = storage_backend.read_values({sheet_name: 1})[sheet_name]
+    return values_to_frame(sheet_name, values)
+
+
+def mirror(source, target, sheet_names=tuple(SHEET_COLUMNS)):
+    # Copies whole sheets between backends, e.g. Google Sheets into a local
+    # SQLite file for offline development, or a local store back to Sheets.
+    row_counts = {}
+    for sheet_name in sheet_names:
+        frame = read_frame(source, sheet_name).dropna(how="all")
+        target.replace_frame(sheet_name, frame)
+        row_counts[sheet_name] = len(frame)
+    return row_counts
@@ -0,0 +1,91 @@
+import itertools
+import threading
+
+import ingest
+import storage
+
+# Every full load gets a new generation, so that anything derived from a
+# frame can tell whether it has only grown since or was rebuilt.
+generations = itertools.count(1)
+
+
+def new_state():
+    return {"lock": threading.Lock(), "sheets": {}}
+
+
+def normalise(row):
+    row = ["" if value is None else value for value in row]
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+def full_load(sheet_name, values):
+    header = values[0] if values else []
+    rows = values[1:]
+    frame = ingest.ingest(sheet_name, storage.values_to_frame(sheet_name, values))
+    frame.attrs["generation"] = next(generations)
+    return {
+        "header": header,
+        "row_count": len(rows),
+        "last_row": normalise(rows[-1]) if rows else None,
+        "frame": frame,
+    }
+
+
+def reset(state):
+    with state["lock"]:
+        state["sheets"].clear()
+
+
+def sync_frames(storage_backend, sheet_names, state, full_reload=False):
+    # Sheets are append-only, so each sheet is re-read from its last synced
+    # row onwards. That row is read again and compared with the copy taken
+    # last time; if it differs, or has gone, earlier rows were edited and the
+    # sheet falls back to a full reload.
+    with state["lock"]:
+        sheets = state["sheets"]
+        if full_reload:
+            sheets.clear()
+        first_rows = {
+            sheet_name: sheets[sheet_name]["row_count"] + 1
+            if sheets.get(sheet_name, {}).get("row_count")
+            else 1
+            for sheet_name in sheet_names
+        }
+        values = storage_backend.read_values(first_rows)
+
+        reload = []
+        for sheet_name in sheet_names:
+            if first_rows[sheet_name] == 1:
+                sheets[sheet_name] = full_load(sheet_name, values[sheet_name])
+                continue
+
+            sheet = sheets[sheet_name]
+            delta = values[sheet_name]
+            if not delta or normalise(delta[0]) != sheet["last_row"]:
+                reload.append(sheet_name)
+                continue
+
+            new_rows = delta[1:]
+            if new_rows:
+                new_frame = ingest.ingest(
+                    sheet_name,
+                    storage.values_to_frame(
+                        sheet_name,
+                        [sheet["header"]] + new_rows,
+                        first_row=sheet["row_count"] + 2,
+                    ),
+                )
+                sheet["frame"] = ingest.append(sheet_name, sheet["frame"], new_frame)
+                sheet["row_count"] += len(new_rows)
+                sheet["last_row"] = normalise(new_rows[-1])
+
+        if reload:
+            values = storage_backend.read_values(
+                {sheet_name: 1 for sheet_name in reload}
+            )
+            for sheet_name in reload:
+                sheets[sheet_name] = full_load(sheet_name, values[sheet_name])
+
+        return {sheet_name: sheets[sheet_name]["frame"] for sheet_name in sheet_names}
@@ -0,0 +1,136 @@
+import sqlite3
+import sys
+import types
+
+import pytest
+import requests
+
+import benchmark
+import key_index
+import save_queue
+import sheets_client
+import storage
+
+# loaders reads st.secrets when imported, so data_entry is imported against a
+# stand-in that each test replaces with a FakeLoaders.
+sys.modules.setdefault("loaders", types.ModuleType("loaders"))
+import data_entry  # noqa: E402
+
+
+class FakeLoaders:
+    # The parts of loaders that the save path uses, over a FakeWorkbook and a
+    # save queue that is only flushed when a test asks.
+
+    def __init__(self, tmp_path):
+        self.workbook = benchmark.FakeWorkbook(benchmark.generate(500, 20))
+        self.storage = storage.SheetsStorage(
+            sheets_client.SheetsClient(self.workbook, 6000)
+        )
+        self.queue = save_queue.SaveQueue(str(tmp_path / "save_queue.db"))
+        self.indexes = {}
+
+    def get_key_index(self, sheet_name):
+        index = self.indexes.setdefault(sheet_name, key_index.KeyIndex(sheet_name))
+        index.refresh(
+            storage.read_frame(self.storage, sheet_name), self.workbook.modified
+        )
+        index.release_jobs(self.queue.abandoned(index.pending_jobs()))
+        return index
+
+    def append_to_sheet(self, sheet_name, rows):
+        return self.queue.enqueue(sheet_name, rows)
+
+    def replace_sheet_row(self, sheet_name, row_number, row):
+        return self.queue.enqueue(sheet_name, [row], row_number=row_number)
+
+    def flush_saves(self):
+        self.queue.flush(self.storage)
+
+
+class FakeStreamlit:
+    def __init__(self, duplicate_policy):
+        self.session_state = {"duplicate_policy": duplicate_policy}
+        self.messages = []
+
+    def warning(self, message):
+        self.messages.append(message)
+
+    error = warning
+
+
+def payment_row(name, amount=1000.0):
+    return ["17-Oct-2026 10:00:00", "May", name, amount, 2026, "2026-05-01"]
+
+
+def sheet_rows(fake_loaders, name):
+    values = fake_loaders.workbook.worksheets["Payments"].values
+    return [row for row in values if row[2] == name and row[4] == 2026]
+
+
+@pytest.fixture
+def fake_loaders(tmp_path, monkeypatch):
+    fake_loaders = FakeLoaders(tmp_path)
+    monkeypatch.setattr(data_entry, "loaders", fake_loaders)
+    return fake_loaders
+
+
+def use_policy(monkeypatch, duplicate_policy):
+    fake_st = FakeStreamlit(duplicate_policy)
+    monkeypatch.setattr(data_entry, "st", fake_st)
+    return fake_st
+
+
+def test_double_submit_before_a_flush_is_skipped(fake_loaders, monkeypatch):
+    fake_st = use_policy(monkeypatch, "Skip")
+
+    assert data_entry.save_keyed_rows("Payments", [payment_row("Member 00001")])
+    assert not data_entry.save_keyed_rows("Payments", [payment_row("Member 00001")])
+    fake_loaders.flush_saves()
+
+    assert len(sheet_rows(fake_loaders, "Member 00001")) == 1
+    assert fake_st.messages == [
+        "⚠️ Member 00001 May 2026 is already recorded and was skipped"
+    ]
+
+
+def test_claims_are_released_when_a_job_is_abandoned(fake_loaders, monkeypatch):
+    use_policy(monkeypatch, "Skip")
+    payments = fake_loaders.workbook.worksheets["Payments"]
+
+    def time_out(values, **kwargs):
+        raise requests.exceptions.Timeout("append timed out")
+
+    monkeypatch.setattr(payments, "append_rows", time_out, raising=False)
+    data_entry.save_keyed_rows("Payments", [payment_row("Member 00001")])
+    fake_loaders.flush_saves()
+    monkeypatch.delattr(payments, "append_rows")
+
+    # The entry may or may not be in the sheet, so it can be entered again.
+    assert data_entry.save_keyed_rows("Payments", [payment_row("Member 00001")])
+    fake_loaders.flush_saves()
+    assert len(sheet_rows(fake_loaders, "Member 00001")) == 1
+
+
+def test_claims_are_released_when_the_save_cannot_be_queued(fake_loaders, monkeypatch):
+    use_policy(monkeypatch, "Skip")
+
+    def locked(sheet_name, rows, row_number=None):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(fake_loaders.queue, "enqueue", locked, raising=False)
+    assert not data_entry.save_keyed_rows("Payments", [payment_row("Member 00001")])
+    monkeypatch.delattr(fake_loaders.queue, "enqueue")
+
+    assert data_entry.save_keyed_rows("Payments", [payment_row("Member 00001")])
+
+
+def test_replace_on_a_queued_entry_flushes_then_replaces(fake_loaders, monkeypatch):
+    use_policy(monkeypatch, "Replace")
+
+    data_entry.save_keyed_rows("Payments", [payment_row("Member 00001", 1000.0)])
+    assert data_entry.save_keyed_rows("Payments", [payment_row("Member 00001", 2000.0)])
+    fake_loaders.flush_saves()
+
+    assert fake_loaders.workbook.calls["append_rows"] == 1
+    assert fake_loaders.workbook.calls["update"] == 1
+    assert [row[3] for row in sheet_rows(fake_loaders, "Member 00001")] == [2000.0]
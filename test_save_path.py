@@ -0,0 +1,52 @@
+import benchmark
+import save_queue
+import sheets_client
+import storage
+
+
+def fake_storage(payment_rows=500):
+    workbook = benchmark.FakeWorkbook(benchmark.generate(payment_rows, 20))
+    return workbook, storage.SheetsStorage(sheets_client.SheetsClient(workbook, 6000))
+
+
+def payment_row(name):
+    return ["17-Oct-2026 10:00:00", "May", name, 1000.0, 2026, "2026-05-01"]
+
+
+def test_append_rows_does_not_read_the_sheet():
+    workbook, storage_backend = fake_storage()
+    payments = workbook.worksheets["Payments"]
+    row_count = len(payments.values)
+
+    storage_backend.append_rows("Payments", [payment_row("Member 00001")])
+
+    assert workbook.calls["get_all_values"] == 0
+    assert workbook.calls["append_rows"] == 1
+    assert payments.append_options[-1]["table_range"] == "a1"
+    assert len(payments.values) == row_count + 1
+
+
+def test_append_cost_does_not_grow_with_the_sheet():
+    small_workbook, small_storage = fake_storage(100)
+    large_workbook, large_storage = fake_storage(20_000)
+
+    small_storage.append_rows("Payments", [payment_row("Member 00001")])
+    large_storage.append_rows("Payments", [payment_row("Member 00001")])
+
+    assert small_workbook.calls == large_workbook.calls
+
+
+def test_queued_saves_flush_without_reading_the_sheet(tmp_path):
+    # The path append_to_sheet takes: the journal, then one batched append.
+    workbook, storage_backend = fake_storage()
+    queue = save_queue.SaveQueue(str(tmp_path / "save_queue.db"))
+    job_ids = [
+        queue.enqueue("Payments", [payment_row(f"Member {number:05d}")])
+        for number in range(3)
+    ]
+
+    assert queue.flush(storage_backend) == (3, 0)
+    assert workbook.calls["get_all_values"] == 0
+    assert workbook.calls["append_rows"] == 1
+    assert workbook.worksheets["Payments"].append_options[-1]["table_range"] == "a1"
+    assert {job["status"] for job in queue.statuses(job_ids).values()} == {"flushed"}
@@ -0,0 +1,98 @@
+import calendar
+
+import pandas as pd
+
+MONTHS = {month.lower(): month for month in list(calendar.month_name)[1:]}
+
+COSTS_SCHEMA = {
+    "Cost Item": {"type": "text"},
+    "Amount": {"type": "amount"},
+    "Narrative": {"type": "text", "required": False},
+}
+
+PAYMENTS_SCHEMA = {
+    "Name": {"type": "member"},
+    "Month": {"type": "month"},
+    "Year": {"type": "year"},
+    "Amount Deposited": {"type": "amount"},
+}
+
+UAP_SCHEMA = {
+    "Opening Balance": {"type": "amount"},
+    "Closing Balance": {"type": "amount"},
+    "Interest rate": {"type": "rate"},
+}
+
+
+def as_text(column):
+    return column.fillna("").astype(str).str.strip()
+
+
+def parse_column(column, rule, context):
+    # Returns the parsed values and a mask of non-blank values that failed.
+    text = as_text(column)
+    kind = rule["type"]
+
+    if kind == "text":
+        return text, pd.Series(False, index=text.index), None
+    if kind == "amount":
+        values = pd.to_numeric(text.str.replace(",", ""), errors="coerce")
+        return values, ~(values > 0), "must be a number greater than zero"
+    if kind == "rate":
+        # "5" and "5%" both mean five percent.
+        values = pd.to_numeric(text.str.rstrip("%").str.strip(), errors="coerce") / 100.0
+        return values, ~(values > 0), "must be a percentage greater than zero"
+    if kind == "month":
+        values = text.str.lower().map(MONTHS)
+        return values, values.isna(), "is not a month name"
+    if kind == "year":
+        values = pd.to_numeric(text, errors="coerce")
+        return values, ~values.isin(context["years"]), "is not a valid year"
+    if kind == "member":
+        return text, ~text.isin(context["names"]), "is not a known member"
+    raise ValueError(f"Unknown field type: {kind}")
+
+
+def validate(frame, schema, context=None, skip_if_blank=None, row_offset=1):
+    context = context or {}
+    missing = [field for field in schema if field not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+    # Rows where every skip_if_blank field is empty were simply not filled in.
+    if skip_if_blank:
+        filled = pd.concat(
+            [as_text(frame[field]) != "" for field in skip_if_blank], axis=1
+        ).any(axis=1)
+        frame = frame[filled]
+
+    clean = pd.DataFrame(index=frame.index)
+    failures = []
+    for field, rule in schema.items():
+        values, invalid, message = parse_column(frame[field], rule, context)
+        blank = as_text(frame[field]) == ""
+        clean[field] = values
+
+        if rule.get("required", True):
+            failures.append((field, blank, "cannot be blank"))
+        failures.append((field, invalid & ~blank, message))
+
+    row_numbers = frame.index.to_series() + row_offset
+    errors = pd.concat(
+        [pd.DataFrame(columns=["Row", "Field", "Error"])]
+        + [
+            pd.DataFrame(
+                {"Row": row_numbers[failed], "Field": field, "Error": f"{field} {message}"}
+            )
+            for field, failed, message in failures
+            if failed.any()
+        ],
+        ignore_index=True,
+    ).sort_values("Row", kind="stable")
+
+    failed_rows = pd.concat(
+        [pd.Series(False, index=frame.index)] + [failed for _, failed, _ in failures],
+        axis=1,
+    ).any(axis=1)
+    return clean[~failed_rows].copy(), errors.reset_index(drop=True)
+